@@ -0,0 +1,95 @@
+'''
+Micro benchmarks of lizard.
+
+    python benchmark.py
+
+Run it before and after a change of the core to see how much it helps.
+'''
+from __future__ import print_function
+import re
+import timeit
+from lizard import analyze_file, get_extensions, fuse_core_processors, \
+    FileInfoBuilder
+from lizard_languages import get_reader_for
+from lizard_languages.code_reader import CodeReader
+
+SMALL_FILES = {
+    "a.c": "int foo(int a) {\n  if (a) return 1;\n  return 0;\n}\n",
+    "a.java": "class A {\n  int foo(int a) {\n    return a > 0 ? 1 : 0;\n"
+              "  }\n}\n",
+    "a.js": "function foo(a) {\n  return a ? /x/g.test(a) : 0;\n}\n",
+    "a.php": "<?php\nfunction foo($a) {\n  if ($a) return 1;\n}\n?>\n",
+    "a.py": "def foo(a):\n    if a:\n        return 1\n    return 0\n",
+    "a.rb": "def foo(a)\n  return 1 if a\n  0\nend\n",
+}
+
+
+def _per_file(setup=None, number=2000):
+    def analyze_all():
+        for filename, code in SMALL_FILES.items():
+            if setup:
+                setup()
+            analyze_file.analyze_source_code(filename, code)
+    seconds = min(timeit.repeat(analyze_all, number=number, repeat=3))
+    return seconds / number / len(SMALL_FILES) * 1e6
+
+
+def _recompile():
+    CodeReader._token_patterns.clear()
+    re.purge()
+
+
+def small_files():
+    '''
+    Per file time on many small files with the token patterns cached (the
+    default), built again for every file (found in the cache of the re
+    module) and compiled again for every file.
+    '''
+    cached = _per_file()
+    rebuilt = _per_file(CodeReader._token_patterns.clear)
+    recompiled = _per_file(_recompile, number=50)
+    print("Small files (us per file):")
+    print("  token pattern cached:     %8.1f" % cached)
+    print("  token pattern rebuilt:    %8.1f" % rebuilt)
+    print("  token pattern recompiled: %8.1f" % recompiled)
+
+
+def _tokens_per_second(processors, filename, code, number=5):
+    reader_class = get_reader_for(filename)
+    tokens = list(reader_class(None).generate_tokens(code))
+
+    def run():
+        reader = reader_class(FileInfoBuilder(filename))
+        stream = iter(tokens)
+        for processor in processors:
+            stream = processor(stream, reader)
+        for _ in stream:
+            pass
+        return reader.context.fileinfo.token_count
+    count = run()
+    seconds = min(timeit.repeat(run, number=number, repeat=7))
+    return count * number / seconds
+
+
+def core_processors():
+    '''
+    Tokens per second per language through the built-in processors,
+    chained and fused. The reader's own state machine is left out so the
+    numbers show only the part the fusion changes.
+    '''
+    chained = get_extensions([])
+    fused = fuse_core_processors(chained)
+    print("Core processors (k tokens per second):")
+    print("  %-8s %10s %10s %8s" % ("", "chained", "fused", "gain"))
+    for filename, code in sorted(SMALL_FILES.items()):
+        code = code * 500
+        before = _tokens_per_second(chained, filename, code)
+        after = _tokens_per_second(fused, filename, code)
+        print("  %-8s %10.1f %10.1f %7.0f%%" % (
+            filename, before / 1000, after / 1000,
+            (after / before - 1) * 100))
+
+
+if __name__ == "__main__":
+    small_files()
+    core_processors()
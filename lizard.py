@@ -22,11 +22,15 @@ For more information visit http://www.lizard.ws
 """
 from __future__ import print_function, division
 import codecs
+import io
 import sys
 import itertools
 import re
 import os
-from fnmatch import fnmatch
+import pickle
+import tempfile
+import time
+from fnmatch import translate
 import hashlib
 
 if sys.version[0] == '2':
@@ -41,8 +45,14 @@ try:
     from lizard_ext import version
     from lizard_ext import print_xml
     from lizard_ext import print_csv
+    from lizard_ext import print_jsonl
     from lizard_ext import html_output
-    from lizard_ext import auto_open, auto_read
+    from lizard_ext import auto_read, decode_source
+    from lizard_ext import ResultCache, DEFAULT_CACHE_SIZE
+    from lizard_ext import FunctionColumns
+    from lizard_ext import ResultFile, save_result
+    from lizard_ext import changed_files, files_under, merge_with_baseline, \
+        load_baseline
 except ImportError:
     sys.stderr.write("Cannot find the lizard_ext modules.")
 
@@ -52,20 +62,28 @@ DEFAULT_CCN_THRESHOLD, DEFAULT_WHITELIST, \
 
 # pylint: disable-msg=too-many-arguments
 def analyze(paths, exclude_pattern=None, threads=1, exts=None,
-            lans=None):
+            lans=None, cache=None, stats=None, pool=None):
     '''
     returns an iterator of file information that contains function
     statistics.
     '''
     exclude_pattern = exclude_pattern or []
-    files = get_all_source_files(paths, exclude_pattern, lans)
-    return analyze_files(files, threads, exts)
+    files = load_source_files(
+        paths, exclude_pattern, lans, threads=threads)
+    return analyze_files(files, threads, exts, cache, stats, pool)
 
 
-def analyze_files(files, threads=1, exts=None):
+def analyze_files(files, threads=1, exts=None, cache=None, stats=None,
+                  pool=None):
+    '''
+    files can be file names or (file name, code) pairs.
+    stats, a WorkerStats, collects how busy the worker processes were.
+    pool, an AnalysisPool, is used instead of starting new processes.
+    '''
     extensions = exts or get_extensions([])
-    file_analyzer = FileAnalyzer(extensions)
-    result = map_files_to_analyzer(files, file_analyzer, threads)
+    file_analyzer = FileAnalyzer(extensions, cache)
+    result = map_files_to_analyzer(
+        files, file_analyzer, threads, stats, pool)
     for extension in extensions:
         if hasattr(extension, 'cross_file_process'):
             result = extension.cross_file_process(result)
@@ -191,6 +209,58 @@ def arg_parser(prog=None):
                         type=int,
                         dest="working_threads",
                         default=1)
+    parser.add_argument("--worker-stats",
+                        help='''print how busy each worker was to the
+                        standard error at the end. Used together with
+                        -t.''',
+                        action="store_true",
+                        dest="worker_stats",
+                        default=False)
+    parser.add_argument("--cache-dir",
+                        help='''Directory to keep the analysis result of each
+                        file. Files that haven't changed since the last run
+                        will not be analyzed again.''',
+                        type=str,
+                        dest="cache_dir")
+    parser.add_argument("--cache-size",
+                        help='''Size limit of the cache directory in MB. The
+                        least recently used results are removed when the
+                        cache grows over it. The default value is %d.
+                        ''' % DEFAULT_CACHE_SIZE,
+                        type=int,
+                        dest="cache_size",
+                        default=DEFAULT_CACHE_SIZE)
+    parser.add_argument("--since",
+                        help='''Only analyze the files changed since the given
+                        git revision. Use it together with --baseline to
+                        still get the result of the whole code base.''',
+                        type=str,
+                        dest="since")
+    parser.add_argument("--baseline",
+                        help='''File to keep the result of the previous run.
+                        The new result is merged into it and saved back.''',
+                        type=str,
+                        dest="baseline")
+    parser.add_argument("--streaming",
+                        help='''Print the default tabular output without
+                        keeping the result of every file in memory. The
+                        file table and the warnings wait in temporary files
+                        and the totals are summed up as the files go by.
+                        Useful for very big code bases.''',
+                        action="store_const",
+                        const=print_streaming_result,
+                        dest="printer")
+    parser.add_argument("--save",
+                        help='''Also save the result into the given file in
+                        a compact binary format, to be read again with
+                        --load.''',
+                        type=str,
+                        dest="save")
+    parser.add_argument("--load",
+                        help='''Print the result saved with --save in the
+                        given file instead of analyzing any code.''',
+                        type=str,
+                        dest="load")
     parser.add_argument("-X", "--xml",
                         help='''Generate XML in cppncss style instead of the
                         tabular output. Useful to generate report in Jenkins
@@ -204,11 +274,30 @@ def arg_parser(prog=None):
                         action="store_const",
                         const=print_csv,
                         dest="printer")
+    parser.add_argument("--jsonl",
+                        help='''Generate JSON Lines, one object for each
+                        function, written as soon as each file is analyzed.
+                        Includes the fields of all the extensions.''',
+                        action="store_const",
+                        const=print_jsonl,
+                        dest="printer")
+    parser.add_argument("--jsonl-files",
+                        help='''With --jsonl, also write one object for each
+                        file after the objects of its functions.''',
+                        action="store_true",
+                        dest="jsonl_files",
+                        default=False)
     parser.add_argument("-H", "--html",
                         help='''Output HTML report''',
                         action="store_const",
                         const=html_output,
                         dest="printer")
+    parser.add_argument("--html-pages",
+                        help='''Write the HTML report into the given directory
+                        as one page for each source directory and an
+                        index.html, instead of a single page.''',
+                        type=str,
+                        dest="html_pages")
     parser.add_argument("-m", "--modified",
                         help='''Calculate modified cyclomatic complexity number
                         , which count a switch/case with multiple cases as
@@ -250,6 +339,8 @@ class Nesting(object):  # pylint: disable=R0903
     '''
     Nesting represent one level of nesting in any programming language.
     '''
+    __slots__ = ()
+
     @property
     def name_in_space(self):
         return ''
@@ -268,7 +359,33 @@ class Namespace(Nesting):  # pylint: disable=R0903
         return self.name + "::" if self.name else ''
 
 
+def _get_record_state(record):
+    state = dict(vars(record))
+    for name in record.FIELDS:
+        if hasattr(record, name):
+            state[name] = getattr(record, name)
+    return state
+
+
+def _set_record_state(record, state):
+    for name, value in state.items():
+        setattr(record, name, value)
+
+
 class FunctionInfo(Nesting):  # pylint: disable=R0902
+    '''
+    The fields lizard itself counts are slots. Fields of the extensions
+    get slots in a subclass made by function_info_class; anything else
+    set on a function still goes to its __dict__.
+    '''
+
+    FIELDS = (
+        'cyclomatic_complexity', 'nloc', 'token_count', 'name', 'long_name',
+        'start_line', 'end_line', 'full_parameters', 'filename',
+        'top_nesting_level', 'length', 'fan_in', 'fan_out',
+        'general_fan_out')
+    __slots__ = FIELDS + ('__dict__',)
+    SCHEMA = ((), ())
 
     def __init__(self, name, filename, start_line=0, ccn=1):
         self.cyclomatic_complexity = ccn
@@ -285,6 +402,14 @@ class FunctionInfo(Nesting):  # pylint: disable=R0902
         self.fan_in = 0
         self.fan_out = 0
         self.general_fan_out = 0
+        for field, default in self.SCHEMA[1]:
+            setattr(self, field, default() if callable(default) else default)
+
+    __getstate__ = _get_record_state
+    __setstate__ = _set_record_state
+
+    def __reduce__(self):
+        return _new_function_info, (self.SCHEMA,), self.__getstate__()
 
     @property
     def name_in_space(self):
@@ -299,8 +424,8 @@ class FunctionInfo(Nesting):  # pylint: disable=R0902
         return self.name.split('::')[-1]
 
     location = property(lambda self:
-                        " %(name)s@%(start_line)s-%(end_line)s@%(filename)s"
-                        % self.__dict__)
+                        " %s@%s-%s@%s" % (self.name, self.start_line,
+                                          self.end_line, self.filename))
 
     parameter_count = property(lambda self: len(self.full_parameters))
 
@@ -333,12 +458,18 @@ class FunctionInfo(Nesting):  # pylint: disable=R0902
 
 class FileInformation(object):  # pylint: disable=R0903
 
+    FIELDS = ('filename', 'nloc', 'function_list', 'token_count')
+    __slots__ = FIELDS + ('__dict__',)
+
     def __init__(self, filename, nloc, function_list=None):
         self.filename = filename
         self.nloc = nloc
         self.function_list = function_list or []
         self.token_count = 0
 
+    __getstate__ = _get_record_state
+    __setstate__ = _set_record_state
+
     average_nloc = property(lambda self: self.functions_average("nloc"))
     average_token_count = property(
         lambda self: self.functions_average("token_count"))
@@ -356,6 +487,50 @@ class FileInformation(object):  # pylint: disable=R0903
         return summary / len(self.function_list) if self.function_list else 0
 
 
+def function_info_schema(extensions):
+    '''
+    The per-function fields declared by the extensions: every key of
+    FUNCTION_INFO, plus the FUNCTION_FIELDS ({name: default}) an extension
+    keeps for itself without showing them. A FUNCTION_INFO column gets
+    its "default", if any, when the function is created, so extensions
+    need no hasattr check for every token. A callable default (e.g. list)
+    is called for each function.
+    '''
+    names = set()
+    defaults = {}
+    for ext in extensions:
+        for name, info in getattr(ext, "FUNCTION_INFO", {}).items():
+            names.add(name)
+            if "default" in info:
+                defaults[name] = info["default"]
+        defaults.update(getattr(ext, "FUNCTION_FIELDS", {}))
+    names = tuple(sorted(
+        name for name in names.union(defaults)
+        if not hasattr(FunctionInfo, name)))
+    return names, tuple(sorted(
+        (name, default) for name, default in defaults.items()
+        if name in names))
+
+
+_FUNCTION_INFO_CLASSES = {FunctionInfo.SCHEMA: FunctionInfo}
+
+
+def function_info_class(schema):
+    ''' The FunctionInfo subclass with a slot for each field of schema. '''
+    if schema not in _FUNCTION_INFO_CLASSES:
+        _FUNCTION_INFO_CLASSES[schema] = type(
+            "FunctionInfo", (FunctionInfo,), {
+                "__slots__": schema[0],
+                "FIELDS": FunctionInfo.FIELDS + schema[0],
+                "SCHEMA": schema})
+    return _FUNCTION_INFO_CLASSES[schema]
+
+
+def _new_function_info(schema):
+    cls = function_info_class(schema)
+    return cls.__new__(cls)
+
+
 class NestingStack(object):
 
     def __init__(self):
@@ -406,12 +581,13 @@ class FileInfoBuilder(object):
     the context information that's needed for the building.
     '''
 
-    def __init__(self, filename):
+    def __init__(self, filename, function_class=FunctionInfo):
         self.fileinfo = FileInformation(filename, 0)
         self.current_line = 0
         self.forgive = False
         self.newline = True
-        self.global_pseudo_function = FunctionInfo('*global*', filename, 0)
+        self.function_class = function_class
+        self.global_pseudo_function = function_class('*global*', filename, 0)
         self.current_function = self.global_pseudo_function
         self.stacked_functions = []
         self._nesting_stack = NestingStack()
@@ -443,7 +619,7 @@ class FileInfoBuilder(object):
         self.newline = count > 0
 
     def try_new_function(self, name):
-        self.current_function = FunctionInfo(
+        self.current_function = self.function_class(
             self.with_namespace(name),
             self.fileinfo.filename,
             self.current_line)
@@ -535,15 +711,89 @@ def condition_counter(tokens, reader):
         yield token
 
 
+def core_counter(tokens, reader, skip_spaces=False):
+    '''
+    comment_counter, line_counter, token_counter and condition_counter
+    fused into one loop. With skip_spaces it does the preprocessing too.
+    '''
+    context = reader.context
+    fileinfo = context.fileinfo
+    get_comment = reader.get_comment_from_token
+    conditions = reader.conditions
+    context.current_line = 1
+    newline = 1
+    for token in tokens:
+        if skip_spaces and token != '\n' and token.isspace():
+            continue
+        comment = get_comment(token)
+        if comment is not None:
+            lines = len(comment.splitlines()[1:])
+            if lines:
+                context.current_line += lines
+                newline = 1
+            if comment.strip().startswith("#lizard forgive"):
+                context.forgive = True
+            if "GENERATED CODE" in comment:
+                return
+        elif token != "\n":
+            count = token.count('\n')
+            context.current_line += count
+            context.add_nloc(count + newline)
+            newline = 0
+            fileinfo.token_count += 1
+            context.current_function.token_count += 1
+            if token in conditions:
+                context.add_condition()
+            yield token
+        else:
+            context.current_line += 1
+            newline = 1
+
+
+def fused_core_processor(tokens, reader):
+    if hasattr(reader, "preprocess"):
+        return core_counter(reader.preprocess(tokens), reader)
+    return core_counter(tokens, reader, skip_spaces=True)
+
+
+CORE_PROCESSORS = (preprocessing, comment_counter, line_counter,
+                   token_counter, condition_counter)
+
+
+def fuse_core_processors(processors):
+    '''
+    Replace the built-in processors with the fused ones where they
+    still run next to each other. Extensions stay in the chain.
+    '''
+    processors = list(processors)
+    for start in range(len(processors)):
+        if tuple(processors[start:start + 5]) == CORE_PROCESSORS:
+            processors[start:start + 5] = [fused_core_processor]
+            break
+        if tuple(processors[start:start + 4]) == CORE_PROCESSORS[1:]:
+            processors[start:start + 4] = [core_counter]
+            break
+    return processors
+
+
 class FileAnalyzer(object):  # pylint: disable=R0903
 
-    def __init__(self, extensions):
-        self.processors = extensions
+    def __init__(self, extensions, cache=None, fused=True):
+        self.processors = (
+            fuse_core_processors(extensions) if fused else extensions)
+        self.schema = function_info_schema(extensions)
+        self.cache = cache
 
-    def __call__(self, filename):
+    def __call__(self, source):
+        filename, code = source if isinstance(source, tuple) else (
+            source, None)
         try:
-            return self.analyze_source_code(
-                filename, auto_read(filename))
+            if code is None:
+                code = auto_read(filename)
+            if self.cache:
+                return self.cache.fetch(
+                    filename, code, self.analyze_source_code)
+            return self.analyze_source_code(filename, code)
         except UnicodeDecodeError:
             sys.stderr.write("Error: doesn't support none utf encoding '%s'\n"
                              % filename)
@@ -557,7 +807,8 @@ class FileAnalyzer(object):  # pylint: disable=R0903
         return FileInformation(filename, 0, [])
 
     def analyze_source_code(self, filename, code):
-        context = FileInfoBuilder(filename)
+        context = FileInfoBuilder(
+            filename, function_info_class(self.schema))
         reader = (get_reader_for(filename) or CLikeReader)(context)
         tokens = reader.generate_tokens(code)
         for processor in self.processors:
@@ -567,18 +818,238 @@ class FileAnalyzer(object):  # pylint: disable=R0903
         return context.fileinfo
 
 
-def map_files_to_analyzer(files, analyzer, working_threads):
-    mapmethod = get_map_method(working_threads)
-    return mapmethod(analyzer, files)
+def map_files_to_analyzer(files, analyzer, working_threads, stats=None,
+                          pool=None):
+    if pool is None and working_threads == 1:
+        return map(analyzer, files)
+    batches = schedule_batches(
+        files, pool.processes if pool else working_threads)
+    owned_pool = None
+    if pool is None:
+        if not batches:
+            return iter([])
+        try:
+            pool = owned_pool = AnalysisPool(working_threads)
+        except ImportError:
+            return map(analyzer, itertools.chain(*batches))
+    if stats is not None:
+        stats.started()
+    results = pool.imap_unordered(BatchAnalyzer(analyzer), batches)
+    return _unbatch(results, stats, owned_pool)
+
+
+def _unbatch(results, stats, owned_pool=None):
+    with owned_pool or _NoPool():
+        for worker, seconds, fileinfos in results:
+            if stats is not None:
+                stats.add(worker, seconds, len(fileinfos))
+            for fileinfo in fileinfos:
+                yield unpack_fileinfo(fileinfo)
+
+
+class _NoPool(object):  # pylint: disable=R0903
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+
+class AnalysisPool(object):
+    '''
+    Worker processes that can be kept and passed to several analyze or
+    analyze_files calls, e.g. in a long running service:
+
+        with AnalysisPool(4) as pool:
+            result = list(analyze(paths, pool=pool))
+
+    Workers are recycled after maxtasksperchild batches when it's
+    given. Leaving the with block waits for the workers to finish, or
+    stops them at once when it's left with an exception.
+    '''
+
+    def __init__(self, processes=None, maxtasksperchild=None):
+        import multiprocessing
+        self.processes = processes or multiprocessing.cpu_count()
+        self.pool = multiprocessing.Pool(
+            self.processes, initializer=_init_worker,
+            maxtasksperchild=maxtasksperchild)
+
+    def imap_unordered(self, func, iterable):
+        return self.pool.imap_unordered(func, iterable)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def terminate(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+
+def _init_worker():
+    # compile the token pattern of every language once when the worker
+    # starts, so that no batch pays for it (a forked worker may have
+    # them from the parent already)
+    for reader in languages():
+        try:
+            for _ in reader.generate_tokens(""):
+                pass
+        except re.error:
+            pass
+
+
+# What a file costs besides its bytes, in bytes.
+FILE_OVERHEAD = 1024
+BATCHES_PER_WORKER = 8
+
+
+def source_size(source):
+    filename, code = source if isinstance(source, tuple) else (source, None)
+    if code is not None:
+        return len(code)
+    try:
+        return os.path.getsize(filename)
+    except OSError:
+        return 0
+
+
+def schedule_batches(sources, workers):
+    '''
+    Groups the sources into batches of roughly the same size for the
+    worker processes, the largest first. A big file gets a batch of its
+    own and goes out early instead of keeping one worker busy at the
+    end, while small files share a batch and the round trip to the
+    worker.
+    '''
+    sized = sorted(
+        ((source_size(source) + FILE_OVERHEAD, source) for source in sources),
+        key=lambda item: item[0], reverse=True)
+    batch_size = sum(size for size, _ in sized) // (
+        workers * BATCHES_PER_WORKER)
+    batches = []
+    batch, batch_bytes = [], 0
+    for size, source in sized:
+        batch.append(source)
+        batch_bytes += size
+        if batch_bytes >= batch_size:
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class BatchAnalyzer(object):  # pylint: disable=R0903
+    ''' Analyzes a batch of files in a worker process. '''
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+
+    def __call__(self, batch):
+        start = time.time()
+        fileinfos = [self.analyzer(source) for source in batch]
+        return os.getpid(), time.time() - start, pack_fileinfos(fileinfos)
+
+
+def pack_fileinfos(fileinfos):
+    '''
+    Turns the results of a batch into plain tuples that are cheaper to
+    pickle than the objects. The attribute names of the functions are
+    sent once per batch, and equal strings (e.g. the tokens kept by
+    -Eio) are made the same object so that pickle sends them only once.
+    See unpack_fileinfo.
+    '''
+    strings = {}
+    schemas = {}
+
+    def shared(value):
+        if isinstance(value, str):
+            return strings.setdefault(value, value)
+        if isinstance(value, list):
+            return [strings.setdefault(v, v) if isinstance(v, str) else v
+                    for v in value]
+        return value
+
+    def pack_function(fun):
+        attrs = fun.__getstate__()
+        key = (fun.SCHEMA, tuple(attrs))
+        schema = schemas.setdefault(key, key)
+        return schema, tuple(shared(v) for v in attrs.values())
+
+    def pack(fileinfo):
+        if not isinstance(fileinfo, FileInformation):
+            return fileinfo
+        return _PackedFileInformation((
+            tuple((k, shared(v) if k != "function_list" else None)
+                  for k, v in fileinfo.__getstate__().items()),
+            [pack_function(fun) for fun in fileinfo.function_list]))
+
+    return [pack(fileinfo) for fileinfo in fileinfos]
+
+
+class _PackedFileInformation(tuple):
+    __slots__ = ()
+
+
+def unpack_fileinfo(packed):
+    if not isinstance(packed, _PackedFileInformation):
+        return packed
+    attrs, functions = packed
+    fileinfo = FileInformation.__new__(FileInformation)
+    fileinfo.__setstate__(dict(attrs))
+    fileinfo.function_list = []
+    for (schema, names), values in functions:
+        fun = _new_function_info(schema)
+        for name, value in zip(names, values):
+            setattr(fun, name, value)
+        fileinfo.function_list.append(fun)
+    return fileinfo
+
+
+class WorkerStats(object):
+    ''' How busy each worker process was during the analysis. '''
+
+    def __init__(self):
+        self.start = self.end = None
+        self.busy = {}
+        self.files = {}
+
+    def started(self):
+        ''' Called when the first batch is handed to the workers. '''
+        self.start = self.end = time.time()
+
+    def add(self, worker, seconds, files):
+        self.busy[worker] = self.busy.get(worker, 0) + seconds
+        self.files[worker] = self.files.get(worker, 0) + files
+        self.end = time.time()
+
+    def report(self, stream):
+        elapsed = max((self.end or 0) - (self.start or 0), 1e-6)
+        for index, worker in enumerate(sorted(self.busy)):
+            stream.write(
+                "worker %d: %d files, %.2fs busy, %.0f%% utilization\n" % (
+                    index + 1, self.files[worker], self.busy[worker],
+                    self.busy[worker] * 100 / elapsed))
 
 
 def warning_filter(option, module_infos):
-    for file_info in module_infos:
-        if file_info:
-            for fun in file_info.function_list:
-                if any(getattr(fun, attr) > limit for attr, limit in
-                       option.thresholds.items()):
-                    yield fun
+    if isinstance(module_infos, AllResult):
+        return iter(module_infos.columns.exceeding(option.thresholds))
+    return (fun for file_info in module_infos if file_info
+            for fun in file_info.function_list
+            if any(getattr(fun, attr) > limit for attr, limit in
+                   option.thresholds.items()))
 
 
 def whitelist_filter(warnings, script=None, whitelist=None):
@@ -760,18 +1231,100 @@ class AllResult(object):
         self.result = list(file_info for file_info in result if file_info)
         self.all_fun = list(itertools.chain(*(file_info.function_list
                                             for file_info in self.result)))
+        self.columns = FunctionColumns(self.all_fun)
 
     def function_count(self):
         return len(self.all_fun) or 1
 
     def nloc_in_functions(self):
-        return sum([f.nloc for f in self.all_fun]) or 1
+        return self.columns.total("nloc") or 1
 
     def as_fileinfo(self):
-        return FileInformation(
-                    "",
+        return _AllFileInformation(
                     sum([f.nloc for f in self.result]),
-                    self.all_fun)
+                    self.columns)
+
+
+class _AllFileInformation(FileInformation):
+    ''' All the files as one, with the averages taken from the columns. '''
+
+    __slots__ = ('columns',)
+
+    def __init__(self, nloc, columns):
+        super(_AllFileInformation, self).__init__(
+            "", nloc, columns.functions)
+        self.columns = columns
+
+    def functions_average(self, att):
+        return self.columns.average(att)
+
+
+class RunningTotal(object):
+    '''
+    The numbers print_total needs, summed up one file at a time, so the
+    files don't have to be kept. Has the interface of AllResult.
+    '''
+
+    def __init__(self, scheme):
+        self.nloc = 0
+        self.functions = 0
+        self.sums = dict.fromkeys(
+            ["nloc"] + [item["value"] for item in scheme.items
+                        if item.get("avg_caption")], 0)
+
+    def add(self, fileinfo):
+        self.nloc += fileinfo.nloc
+        self.functions += len(fileinfo.function_list)
+        for fun in fileinfo.function_list:
+            for name in self.sums:
+                self.sums[name] += getattr(fun, name)
+
+    def function_count(self):
+        return self.functions or 1
+
+    def nloc_in_functions(self):
+        return self.sums["nloc"] or 1
+
+    def as_fileinfo(self):
+        return _RunningFileInformation(self)
+
+
+class _RunningFileInformation(FileInformation):
+
+    __slots__ = ('total',)
+
+    def __init__(self, total):
+        super(_RunningFileInformation, self).__init__("", total.nloc)
+        self.total = total
+
+    def functions_average(self, att):
+        if not self.total.functions:
+            return 0
+        return self.total.sums[att] / self.total.functions
+
+
+class _Spool(object):
+    ''' Objects waiting in a temporary file until they are read back. '''
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.file.close()
+
+    def write(self, obj):
+        pickle.dump(obj, self.file, pickle.HIGHEST_PROTOCOL)
+
+    def __iter__(self):
+        self.file.seek(0)
+        while True:
+            try:
+                yield pickle.load(self.file)
+            except EOFError:
+                return
 
 
 def print_total(warning_count, warning_nloc, all_result, scheme):
@@ -791,35 +1344,50 @@ def print_total(warning_count, warning_nloc, all_result, scheme):
                   nloc_rate=(warning_nloc/all_result.nloc_in_functions())))
 
 
+def print_functions(module_info, scheme):
+    for fun in module_info.function_list:
+        try:
+            print(scheme.function_info(fun))
+        except UnicodeEncodeError:
+            print("Found ill-formatted unicode function name.")
+
+
+def print_file_table_head(file_count, scheme):
+    print("%d file analyzed." % file_count)
+    print("==============================================================")
+    print("NLOC   " + scheme.average_captions() + " function_cnt    file")
+    print("--------------------------------------------------------------")
+
+
+def file_table_row(module_info, scheme):
+    return (
+        "{module.nloc:7d}" +
+        scheme.average_formatter() +
+        "{function_count:10d}" +
+        "     {module.filename}").format(
+        module=module_info,
+        function_count=len(module_info.function_list))
+
+
 def print_and_save_modules(all_fileinfos, scheme):
     saved_fileinfos = []
     print(scheme.function_info_head())
     for module_info in all_fileinfos:
         if module_info:
             saved_fileinfos.append(module_info)
-            for fun in module_info.function_list:
-                try:
-                    print(scheme.function_info(fun))
-                except UnicodeEncodeError:
-                    print("Found ill-formatted unicode function name.")
-    print("%d file analyzed." % (len(saved_fileinfos)))
-    print("==============================================================")
-    print("NLOC   " + scheme.average_captions() + " function_cnt    file")
-    print("--------------------------------------------------------------")
+            print_functions(module_info, scheme)
+    print_file_table_head(len(saved_fileinfos), scheme)
     for module_info in saved_fileinfos:
-        print((
-            "{module.nloc:7d}" +
-            scheme.average_formatter() +
-            "{function_count:10d}" +
-            "     {module.filename}").format(
-            module=module_info,
-            function_count=len(module_info.function_list)))
+        print(file_table_row(module_info, scheme))
     return saved_fileinfos
 
 
 def get_warnings(code_infos, option):
-    warnings = whitelist_filter(warning_filter(option, code_infos),
-                                whitelist=option.whitelist)
+    return whitelisted_warnings(warning_filter(option, code_infos), option)
+
+
+def whitelisted_warnings(warnings, option):
+    warnings = whitelist_filter(warnings, whitelist=option.whitelist)
     if isinstance(option.sorting, list) and option.sorting:
         warnings = sorted(warnings, reverse=True, key=lambda x: getattr(
             x, option.sorting[0]))
@@ -827,10 +1395,38 @@ def get_warnings(code_infos, option):
 
 
 def print_result(result, option, scheme, total_factory):
-    result = print_and_save_modules(result, scheme)
-    warnings = get_warnings(result, option)
+    all_result = total_factory(print_and_save_modules(result, scheme))
+    warnings = get_warnings(all_result, option)
     warning_count, warning_nloc = print_warnings(option, scheme, warnings)
-    print_total(warning_count, warning_nloc, total_factory(result), scheme)
+    print_total(warning_count, warning_nloc, all_result, scheme)
+    return warning_count
+
+
+def print_streaming_result(result, option, scheme, _):
+    '''
+    The same output as print_result, keeping only the running totals in
+    memory. The rows of the file table and the warnings are spooled to
+    temporary files until the function table is done. Sorting the
+    warnings (-s) still needs all of them in memory.
+    '''
+    total = RunningTotal(scheme)
+    file_count = 0
+    with _Spool() as file_table, _Spool() as warnings:
+        print(scheme.function_info_head())
+        for module_info in result:
+            if module_info:
+                file_count += 1
+                print_functions(module_info, scheme)
+                file_table.write(file_table_row(module_info, scheme))
+                for warning in warning_filter(option, [module_info]):
+                    warnings.write(warning)
+                total.add(module_info)
+        print_file_table_head(file_count, scheme)
+        for row in file_table:
+            print(row)
+        warning_count, warning_nloc = print_warnings(
+            option, scheme, whitelisted_warnings(warnings, option))
+    print_total(warning_count, warning_nloc, total, scheme)
     return warning_count
 
 
@@ -859,68 +1455,209 @@ def print_msvs_style_warning(code_infos, option, scheme, _):
     return count
 
 
-def get_map_method(working_threads):
-    try:
-        if working_threads == 1:
-            raise ImportError
-        import multiprocessing
-        pool = multiprocessing.Pool(processes=working_threads)
-        return pool.imap_unordered
-    except ImportError:
-        return map
+def get_all_source_files(paths, exclude_patterns, lans, listed_files=None):
+    '''
+    Function returns the names of the source files to analyze.
+    See load_source_files. '''
+    return (filename for filename, _ in
+            load_source_files(paths, exclude_patterns, lans, listed_files))
 
 
-def md5_hash_file(full_path_name):
-    ''' return md5 hash of a file '''
+class FileDigest(object):
+    '''
+    The md5 hashes of the beginning and of the whole content of a file,
+    read only when they are needed.
+    '''
+
+    HEAD_SIZE = 4096
+
+    def __init__(self, pathname, size):
+        self.pathname = pathname
+        self.size = size
+        self.keep_content = True
+        self.content = None
+        self._head = None
+        self._full = None
+
+    def _read(self, size=-1):
+        with io.open(self.pathname, 'rb') as binary:
+            data = binary.read(size)
+        if self.keep_content and len(data) == self.size:
+            self.content = data
+        return hashlib.md5(data).digest()
+
+    def head(self):
+        if self._head is None:
+            self._head = self._read(self.HEAD_SIZE)
+            if self.size <= self.HEAD_SIZE:
+                self._full = self._head
+        return self._head
+
+    def full(self):
+        if self._full is None:
+            self._full = self._read()
+        return self._full
+
+    def same_as(self, other):
+        try:
+            return self.head() == other.head() and \
+                self.full() == other.full()
+        except IOError:
+            return False
+
+
+class DuplicateFileFilter(object):
+    '''
+    Finds the files that are duplicates of the earlier ones in stages,
+    reading as little as possible:
+        * hardlinks and symlinks to the same file are found by the
+          device and inode numbers, without reading;
+        * a file with a size no earlier file has is not read at all;
+        * files of the same size are compared by the hash of their
+          beginning, and only then by the hash of the whole content.
+    '''
+
+    def __init__(self):
+        self.identities = set()
+        self.same_size = {}
+
+    def check(self, pathname):
+        '''
+        returns (unique, content). The content is the bytes of the file
+        if it had to be read in full, otherwise None.
+        '''
+        try:
+            stat = os.stat(pathname)
+        except OSError:
+            return True, None
+        if stat.st_ino:
+            identity = (stat.st_dev, stat.st_ino)
+            if identity in self.identities:
+                return False, None
+            self.identities.add(identity)
+        digest = FileDigest(pathname, stat.st_size)
+        others = self.same_size.setdefault(stat.st_size, [])
+        if any(digest.same_as(other) for other in others):
+            return False, None
+        others.append(digest)
+        content, digest.content = digest.content, None
+        digest.keep_content = False
+        return True, content
+
+
+def compile_exclude_patterns(patterns):
+    '''
+    Compiles the exclude patterns into two matchers. The first tells if
+    a file is excluded. The second tells if everything in a directory is
+    excluded, so the directory doesn't need to be walked at all. That is
+    the case when a pattern ending with "*" (e.g. "./folder/*") matches
+    the directory path followed by a separator.
+    '''
+    def _matcher(pats):
+        if not pats:
+            return lambda _: False
+        regex = re.compile(
+            "(?:" + "|".join(
+                translate(os.path.normcase(p)) for p in pats) + ")")
+        return lambda path: regex.match(os.path.normcase(path)) is not None
+    file_matcher = _matcher(patterns)
+    dir_matcher = _matcher([p for p in patterns if p.endswith("*")])
+    return file_matcher, lambda path: dir_matcher(os.path.join(path, ''))
+
+
+def _scan_dir(dirpath):
+    files, dirs = [], []
     try:
-        with auto_open(full_path_name, mode='r') as source_file:
-            if sys.version_info[0] == 3:
-                code_md5 = hashlib.md5(source_file.read().encode('utf-8'))
-            else:
-                code_md5 = hashlib.md5(source_file.read())
-        return code_md5.hexdigest()
-    except IOError:
-        return None
-    except UnicodeDecodeError:
-        return None
-    except UnicodeEncodeError:
-        return None
+        if hasattr(os, "scandir"):
+            for entry in os.scandir(dirpath):
+                if not entry.is_dir():
+                    files.append(entry.path)
+                elif not entry.is_symlink():
+                    dirs.append(entry.path)
+        else:
+            for name in os.listdir(dirpath):
+                path = os.path.join(dirpath, name)
+                if not os.path.isdir(path):
+                    files.append(path)
+                elif not os.path.islink(path):
+                    dirs.append(path)
+    except OSError:
+        pass
+    return files, dirs
 
 
-def get_all_source_files(paths, exclude_patterns, lans):
+def walk_files(path, prune=None, threads=1):
+    '''
+    Yields every file under the directory. The sub-directories for which
+    prune(dirpath) is true are not entered. With more than one thread, the
+    directories of the same depth are listed in parallel.
+    '''
+    executor = None
+    if threads > 1:
+        try:
+            from concurrent.futures import ThreadPoolExecutor
+            executor = ThreadPoolExecutor(max_workers=threads)
+        except ImportError:
+            pass
+    map_method = executor.map if executor else map
+    level = [path]
+    try:
+        while level:
+            next_level = []
+            for files, dirs in map_method(_scan_dir, level):
+                for filename in files:
+                    yield filename
+                next_level += [d for d in dirs if not (prune and prune(d))]
+            level = next_level
+    finally:
+        if executor:
+            executor.shutdown()
+
+
+def load_source_files(paths, exclude_patterns, lans, listed_files=None,
+                      threads=1):
     '''
-    Function counts md5 hash for the given file and checks if it isn't a
-    duplicate using set of hashes for previous files '''
-    hash_set = set()
+    Function yields (filename, code) of each source file to analyze,
+    skipping the duplicates of the earlier files (see DuplicateFileFilter).
+    The code is given if the file had to be read in full to find that
+    out, so it doesn't need to be read again. Otherwise it is None and
+    the analyzer reads the file.
+    The files are searched in the paths unless listed_files is given.
+    Directories excluded as a whole are not walked into, and with more
+    than one thread they are listed in parallel. '''
+    duplicate_filter = DuplicateFileFilter()
+    excluded, excluded_dir = compile_exclude_patterns(exclude_patterns)
 
     def _support(reader):
         return not lans or set(lans).intersection(
             reader.language_names)
 
     def _validate_file(pathname):
+        reader = get_reader_for(pathname)
         return (
             pathname in paths or (
-                get_reader_for(pathname) and
-                _support(get_reader_for(pathname)) and
-                all(not fnmatch(pathname, p) for p in exclude_patterns) and
-                _not_duplicate(pathname)))
-
-    def _not_duplicate(full_path_name):
-        fhash = md5_hash_file(full_path_name)
-        if not fhash or fhash not in hash_set:
-            hash_set.add(fhash)
-            return True
+                reader and
+                _support(reader) and
+                not excluded(pathname)))
 
     def all_listed_files(paths):
         for path in paths:
             if os.path.isfile(path):
                 yield path
             else:
-                for root, _, files in os.walk(path, topdown=False):
-                    for filename in files:
-                        yield os.path.join(root, filename)
+                for filename in walk_files(path, excluded_dir, threads):
+                    yield filename
 
-    return filter(_validate_file, all_listed_files(paths))
+    if listed_files is None:
+        listed_files = all_listed_files(paths)
+    for pathname in filter(_validate_file, listed_files):
+        if pathname in paths:
+            yield pathname, None
+            continue
+        unique, content = duplicate_filter.check(pathname)
+        if unique:
+            yield pathname, (
+                decode_source(content) if content is not None else None)
 
 
 def parse_args(argv):
@@ -937,6 +1674,9 @@ def parse_args(argv):
     parser = extend_parser(arg_parser(argv[0]))
     opt = parser.parse_args(args=argv[1:])
     opt.extensions = get_extensions(opt.extensions)
+    for ext in opt.extensions:
+        if hasattr(ext, "apply_args"):
+            ext.apply_args(opt)
     values = OutputScheme(opt.extensions).value_columns()
     no_fields = (set(opt.sorting) | set(opt.thresholds.keys())) - set(values)
     if no_fields:
@@ -956,6 +1696,8 @@ def parse_args(argv):
         opt.thresholds["nloc"] = 1000000
     if "parameter_count" not in opt.thresholds:
         opt.thresholds["parameter_count"] = opt.arguments
+    if opt.html_pages and not opt.printer:
+        opt.printer = html_output
     if opt.output_file:
         inferred_printer = infer_printer_from_file_ext(opt.output_file)
         if inferred_printer:
@@ -972,6 +1714,7 @@ def infer_printer_from_file_ext(path):
         '.csv': print_csv,
         '.htm': html_output,
         '.html': html_output,
+        '.jsonl': print_jsonl,
         '.xml': print_xml
     }
     _, ext = os.path.splitext(path)
@@ -1034,15 +1777,24 @@ def main(argv=None):
     if options.output_file:
         output_file = open_output_file(options.output_file)
         sys.stdout = output_file
-    result = analyze(
-        options.paths,
-        options.exclude,
-        options.working_threads,
-        options.extensions,
-        options.languages)
+    cache = None
+    if options.cache_dir:
+        cache = ResultCache(
+            options.cache_dir, options.extensions, options.cache_size)
+    stats = WorkerStats() if options.worker_stats else None
+    if options.load:
+        result = iter(ResultFile(options.load))
+    else:
+        result = analyze_with_options(options, cache, stats)
+    if options.save:
+        result = save_result(result, options.save, options.extensions)
     warning_count = printer(result, options, schema, AllResult)
     print_extension_results(options.extensions)
     list(result)
+    if stats:
+        stats.report(sys.stderr)
+    if cache:
+        cache.prune()
     if output_file:
         sys.stdout = original_stdout
         output_file.close()
@@ -1050,6 +1802,36 @@ def main(argv=None):
         sys.exit(1)
 
 
+def analyze_with_options(options, cache=None, stats=None):
+    baseline = None
+    if options.baseline:
+        baseline = load_baseline(options.baseline, options.extensions)
+    if not options.since or (options.baseline and baseline is None):
+        result = analyze(
+            options.paths,
+            options.exclude,
+            options.working_threads,
+            options.extensions,
+            options.languages,
+            cache,
+            stats)
+        replaced = None
+    else:
+        changed, deleted = changed_files(options.since)
+        files = load_source_files(
+            options.paths, options.exclude, options.languages,
+            files_under(options.paths, changed),
+            options.working_threads)
+        result = analyze_files(
+            files, options.working_threads, options.extensions, cache,
+            stats)
+        replaced = changed + deleted
+    if options.baseline:
+        result = merge_with_baseline(
+            result, options.baseline, options.extensions, baseline, replaced)
+    return result
+
+
 def print_extension_results(extensions):
     for extension in extensions:
         if hasattr(extension, 'print_result'):
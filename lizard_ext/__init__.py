@@ -1,18 +1,31 @@
 """ extensions of lizard """
 
 from __future__ import print_function
+import sys
 from .version import version
 from .htmloutput import html_output
 from .csvoutput import csv_output
-from .xmloutput import xml_output
-from .auto_open import auto_open, auto_read
+from .jsonloutput import jsonl_output
+from .xmloutput import xml_output, write_xml
+from .auto_open import auto_open, auto_read, decode_source
+from .result_cache import ResultCache, DEFAULT_CACHE_SIZE
+from .columns import FunctionColumns
+from .result_file import ResultFile, save_result
+from .incremental import changed_files, files_under, merge_with_baseline, \
+    load_baseline
 
 
-def print_xml(results, options, _, total_factory):
-    print(xml_output(total_factory(list(results)), options.verbose))
+def print_xml(results, options, *_):
+    write_xml(results, options.verbose, sys.stdout)
+    print()
     return 0
 
 
 def print_csv(results, options, _, total_factory):
     csv_output(total_factory(list(results)), options)
     return 0
+
+
+def print_jsonl(results, options, *_):
+    jsonl_output(results, options)
+    return 0
@@ -1,6 +1,5 @@
 '''Open file with automatic encoding'''
 import io
-import os
 import codecs
 
 
@@ -18,19 +17,28 @@ def auto_open(*args, **kwargs):
         UTF-8 With BOM
 
     '''
-    size = min(32, os.path.getsize(args[0]))
-    with io.open(args[0], 'rb') as binary:
-        if binary.read(size).startswith(codecs.BOM_UTF8):
-            kwargs["encoding"] = 'utf-8-sig'
-            return io.open(*args, **kwargs)
+    mode = args[1] if len(args) > 1 else kwargs.get("mode", "r")
+    if 'r' in mode and 'b' not in mode:
+        with io.open(args[0], 'rb') as binary:
+            if binary.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8:
+                kwargs["encoding"] = 'utf-8-sig'
     return io.open(*args, **kwargs)
 
 
-def auto_read(filename):
+def decode_source(binary):
+    '''
+    Decode the content of a source file the same way as auto_open
+    would read it.
+    '''
+    encoding = None
+    if binary.startswith(codecs.BOM_UTF8):
+        encoding = 'utf-8-sig'
     try:
-        with auto_open(filename, 'r') as current_file:
-            return current_file.read()
-
+        return io.TextIOWrapper(io.BytesIO(binary), encoding=encoding).read()
     except UnicodeDecodeError:
-        with open(filename, 'rb') as current_file:
-            return current_file.read().decode('utf8', 'ignore')
+        return binary.decode('utf8', 'ignore')
+
+
+def auto_read(filename):
+    with io.open(filename, 'rb') as current_file:
+        return decode_source(current_file.read())
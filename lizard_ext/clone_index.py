@@ -0,0 +1,268 @@
+'''
+The index of the duplicate extension, built to stay inside a memory
+budget so that -Eduplicate can run on code bases with more tokens than
+fit in memory.
+
+The window hashes and lines of all the files are kept in arrays that
+move to temporary files once they grow over their share of the budget,
+and are read back through mmap. The positions of each hash are found by
+sorting the positions by hash, and then by the first position of their
+hash, in sorted runs written to temporary files and merged.
+'''
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from collections import deque
+from itertools import groupby
+
+# the hash and the position are sorted together as one integer
+_POSITION_BITS = 40
+_POSITION_MASK = (1 << _POSITION_BITS) - 1
+_LOW_64 = (1 << 64) - 1
+
+try:
+    INDEX_TYPECODE = array('Q').typecode
+except ValueError:  # Python 2
+    INDEX_TYPECODE = 'L'
+
+
+class SpooledArray(object):
+    '''
+    An array that is written to a temporary file once it is bigger
+    than max_size bytes. view() gives the values once all are added.
+    '''
+
+    def __init__(self, typecode, max_size=None):
+        self.typecode = typecode
+        self.max_size = max_size
+        self.values = array(typecode)
+        self.file = None
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def extend(self, values):
+        self.length += len(values)
+        if self.file is None:
+            self.values.extend(values)
+            if self.max_size is None or \
+                    self.values.itemsize * len(self.values) <= self.max_size:
+                return
+            values, self.values = self.values, None
+            self.file = tempfile.TemporaryFile()
+        self.file.seek(0, 2)
+        array(self.typecode, values).tofile(self.file)
+
+    def view(self):
+        if self.file is None:
+            return self.values
+        self.file.flush()
+        return _mapped_array(self.file, self.typecode, self.length)
+
+
+def _mapped_array(source, typecode, length):
+    mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return memoryview(mapped).cast(typecode)
+    except (AttributeError, TypeError):  # Python 2
+        values = array(typecode)
+        source.seek(0)
+        values.fromfile(source, length)
+        return values
+
+
+class ExternalSort(object):
+    '''
+    Sorts unsigned integers of up to 128 bits. The integers wait in memory
+    until they would take more than max_size bytes, then they are sorted
+    and written to a temporary file as a run. Iterating merges the runs.
+    '''
+
+    ITEM_SIZE = 48  # about what a big int in a list takes
+    CHUNK = 4096
+    record = struct.Struct("<QQ")
+
+    def __init__(self, max_size=None):
+        self.max_items = None if max_size is None else \
+            max(self.CHUNK, max_size // self.ITEM_SIZE)
+        self.items = []
+        self.runs = []
+
+    def add(self, item):
+        self.items.append(item)
+        if len(self.items) == self.max_items:
+            self._spill()
+
+    def _spill(self):
+        self.items.sort()
+        run = tempfile.TemporaryFile()
+        _write_run(run, self.items)
+        run.seek(0)
+        self.runs.append(run)
+        self.items = []
+
+    def __iter__(self):
+        if not self.runs:
+            items, self.items = self.items, []
+            items.sort()
+            return iter(items)
+        if self.items:
+            self._spill()
+        return heapq.merge(*[_read_run(run) for run in self.runs])
+
+
+def _write_run(run, items):
+    pack = ExternalSort.record.pack
+    chunk = []
+    for item in items:
+        chunk.append(pack(item >> 64, item & _LOW_64))
+        if len(chunk) == ExternalSort.CHUNK:
+            run.write(b"".join(chunk))
+            chunk = []
+    run.write(b"".join(chunk))
+
+
+def _read_run(run):
+    size = ExternalSort.record.size
+    unpack_from = ExternalSort.record.unpack_from
+    data = run.read(size * ExternalSort.CHUNK)
+    while data:
+        for offset in range(0, len(data), size):
+            high, low = unpack_from(data, offset)
+            yield high << 64 | low
+        data = run.read(size * ExternalSort.CHUNK)
+    run.close()
+
+
+def _read_run_file(path):
+    try:
+        for item in _read_run(open(path, "rb")):
+            yield item
+    finally:
+        os.remove(path)
+
+
+def clone_groups(hashes, boundaries, collapse_repeat_tokens, max_size=None,
+                 pool=None):
+    '''
+    The positions of each of the hashes, one list for each hash, in the
+    order of their first position. A hash that was already seen in the
+    last collapse_repeat_tokens positions of the same file is left out.
+
+    With a pool (an AnalysisPool) the hashes are split into a shard for
+    each worker by their value, and the workers group the shards. Only
+    the merge of the groups is left to this process. The sorts share
+    max_size bytes.
+    '''
+    positions = _unique_positions(hashes, boundaries, collapse_repeat_tokens)
+    if pool is None or not hashes:
+        items = _by_first_position(
+            (node_hash << _POSITION_BITS | i for i, node_hash in positions),
+            max_size)
+    else:
+        items = _sharded_by_first_position(hashes, positions, max_size, pool)
+    for _, group in groupby(items, _high_part):
+        yield [item & _POSITION_MASK for item in group]
+
+
+def _unique_positions(hashes, boundaries, collapse_repeat_tokens):
+    for i, node_hash in enumerate(hashes):
+        if i in boundaries:
+            recent = deque([None] * collapse_repeat_tokens)
+        if node_hash not in recent:
+            yield i, node_hash
+        recent.append(node_hash)
+        recent.popleft()
+
+
+def _by_first_position(items, max_size):
+    '''
+    Sorts the items of hash and position into items of the first
+    position of the hash and the position.
+    '''
+    half = None if max_size is None else max_size // 2
+    by_hash = ExternalSort(half)
+    for item in items:
+        by_hash.add(item)
+    by_first = ExternalSort(half)
+    for _, group in groupby(by_hash, _high_part):
+        first = None
+        for item in group:
+            if first is None:
+                first = (item & _POSITION_MASK) << _POSITION_BITS
+            by_first.add(first | item & _POSITION_MASK)
+    return by_first
+
+
+def _sharded_by_first_position(hashes, positions, max_size, pool):
+    shard_count = pool.processes
+    hashes_file = _named_temporary_file()
+    shard_files = [_named_temporary_file() for _ in range(shard_count)]
+    try:
+        with hashes_file:
+            if isinstance(hashes, list):
+                hashes = array(INDEX_TYPECODE, hashes)
+            hashes_file.write(hashes)
+        buffers = [array(INDEX_TYPECODE) for _ in shard_files]
+        for i, node_hash in positions:
+            shard = node_hash % shard_count
+            buffers[shard].append(i)
+            if len(buffers[shard]) == ExternalSort.CHUNK:
+                buffers[shard].tofile(shard_files[shard])
+                del buffers[shard][:]
+        for values, shard_file in zip(buffers, shard_files):
+            with shard_file:
+                values.tofile(shard_file)
+        outputs = list(pool.imap_unordered(_group_shard, [
+            (hashes_file.name, shard_file.name,
+             None if max_size is None else max_size // shard_count)
+            for shard_file in shard_files]))
+    finally:
+        for temp in [hashes_file] + shard_files:
+            os.remove(temp.name)
+    return heapq.merge(*[_read_run_file(path) for path in outputs])
+
+
+def _named_temporary_file():
+    return tempfile.NamedTemporaryFile(delete=False)
+
+
+def _group_shard(task):
+    '''
+    Runs in a worker: groups the positions of one shard and writes them
+    by their first position to a file, and gives back its path.
+    '''
+    hashes_path, positions_path, max_size = task
+    with open(hashes_path, "rb") as hashes_file:
+        hashes = _mapped_array(
+            hashes_file, INDEX_TYPECODE,
+            os.path.getsize(hashes_path) // array(INDEX_TYPECODE).itemsize)
+    items = _by_first_position(
+        (hashes[i] << _POSITION_BITS | i
+         for i in _read_positions(positions_path)),
+        max_size)
+    with _named_temporary_file() as output:
+        _write_run(output, items)
+    return output.name
+
+
+def _read_positions(path):
+    with open(path, "rb") as source:
+        while True:
+            values = array(INDEX_TYPECODE)
+            try:
+                values.fromfile(source, ExternalSort.CHUNK)
+            except EOFError:
+                pass
+            if not values:
+                break
+            for i in values:
+                yield i
+
+
+def _high_part(item):
+    return item >> _POSITION_BITS
@@ -0,0 +1,162 @@
+'''
+The clone index of the duplicate extension kept across runs, next to the
+result cache (lizard -Eduplicate --cache-dir DIR).
+
+A run over the whole code base saves the window hashes of every file,
+and the same windows sorted by their hash. A run with --since then only
+has the changed files to hash. The windows of the other files that share
+a hash with them are looked up in the saved index with a binary search,
+so the duplicates that the change brings in can be found without the
+rest of the code base. Only the runs of windows that share a hash with
+the changed files are read from the index.
+
+Layout, all little-endian:
+
+    header     MAGIC, FORMAT_VERSION, the counts and the offsets of the
+               sections below
+    signature  the utf-8 result signature the index was built with
+    files      for each file: its first window, its number of windows,
+               the length of its name and the utf-8 name
+    hashes     the hash of every window, file by file (uint64)
+    lines      the start line and then the end line of every window
+               (int32)
+    sorted     (hash, window) pairs of every window sorted by the hash
+               (uint64)
+'''
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from .clone_index import INDEX_TYPECODE, ExternalSort
+
+MAGIC = b"LZCI"
+FORMAT_VERSION = 1
+CLONE_INDEX_NAME = "clone_index"
+
+# magic, version, number of files and windows, offsets of the signature,
+# the files, the hashes, the lines and the sorted pairs
+_HEADER = struct.Struct("<4sIQQQQQQQ")
+_FILE = struct.Struct("<QQI")
+_PAIR = struct.Struct("<QQ")
+
+# the window is sorted with its hash as one integer
+_WINDOW_BITS = 40
+_WINDOW_MASK = (1 << _WINDOW_BITS) - 1
+
+
+def _align(out):
+    out.write(b"\0" * (-out.tell() % 8))
+    return out.tell()
+
+
+def save_clone_index(path, signature, files, hashes, lines, max_size=None):
+    '''
+    Saves the index of the windows of files, a list of (first window,
+    filename). lines are the (start lines, end lines) of the windows.
+    The file is replaced at once when it's written.
+    '''
+    directory = os.path.dirname(path) or "."
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    handle, temp = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(handle, "wb") as out:
+            _write_clone_index(out, signature, files, hashes, lines, max_size)
+        os.rename(temp, path)
+    except (IOError, OSError):
+        os.remove(temp)
+
+
+def _write_clone_index(out, signature, files, hashes, lines, max_size):
+    out.write(b"\0" * _HEADER.size)
+    signature_at = out.tell()
+    out.write(signature.encode("utf-8"))
+    files_at = _align(out)
+    ends = [offset for offset, _ in files[1:]] + [len(hashes)]
+    for (offset, filename), end in zip(files, ends):
+        name = filename.encode("utf-8")
+        out.write(_FILE.pack(offset, end - offset, len(name)) + name)
+    hashes_at = _align(out)
+    _write_array(out, INDEX_TYPECODE, hashes)
+    lines_at = out.tell()
+    for values in lines:
+        _write_array(out, 'i', values)
+    sorted_at = out.tell()
+    by_hash = ExternalSort(max_size)
+    for window, node_hash in enumerate(hashes):
+        by_hash.add(node_hash << _WINDOW_BITS | window)
+    chunk = []
+    for item in by_hash:
+        chunk.append(_PAIR.pack(item >> _WINDOW_BITS, item & _WINDOW_MASK))
+        if len(chunk) == ExternalSort.CHUNK:
+            out.write(b"".join(chunk))
+            chunk = []
+    out.write(b"".join(chunk))
+    out.seek(0)
+    out.write(_HEADER.pack(
+        MAGIC, FORMAT_VERSION, len(files), len(hashes), signature_at,
+        files_at, hashes_at, lines_at, sorted_at))
+
+
+def _write_array(out, typecode, values):
+    for start in range(0, len(values), ExternalSort.CHUNK):
+        out.write(array(typecode, values[start:start + ExternalSort.CHUNK])
+                  .tobytes())
+
+
+class StoredCloneIndex(object):
+    '''
+    A saved clone index read through mmap. Raises ValueError when the
+    file is not a clone index or was built with another signature.
+    '''
+
+    def __init__(self, path, signature):
+        with open(path, "rb") as source:
+            self.map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map.size() < _HEADER.size:
+            raise ValueError("'%s' is not a clone index" % path)
+        (magic, version, file_count, self.window_count, signature_at,
+         files_at, hashes_at, lines_at, sorted_at) = \
+            _HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or \
+                self.map[signature_at:files_at].rstrip(b"\0") != \
+                signature.encode("utf-8"):
+            raise ValueError("'%s' is not a clone index of this run" % path)
+        self.offsets = []
+        self.counts = []
+        self.filenames = []
+        for _ in range(file_count):
+            offset, count, length = _FILE.unpack_from(self.map, files_at)
+            files_at += _FILE.size
+            self.offsets.append(offset)
+            self.counts.append(count)
+            self.filenames.append(
+                self.map[files_at:files_at + length].decode("utf-8"))
+            files_at += length
+        view = memoryview(self.map)
+        count = self.window_count
+        self.hashes = view[hashes_at:lines_at].cast(INDEX_TYPECODE)
+        self.start_lines = view[lines_at:lines_at + 4 * count].cast('i')
+        self.end_lines = view[lines_at + 4 * count:sorted_at].cast('i')
+        pairs = view[sorted_at:sorted_at + 16 * count].cast(INDEX_TYPECODE)
+        self.sorted_hashes = pairs[0::2]
+        self.sorted_windows = pairs[1::2]
+
+    def windows_with(self, hashes):
+        ''' The saved windows with any of the hashes, in order. '''
+        found = set()
+        for node_hash in set(hashes):
+            first = bisect_left(self.sorted_hashes, node_hash)
+            last = bisect_right(self.sorted_hashes, node_hash, first)
+            found.update(self.sorted_windows[first:last])
+        return sorted(found)
+
+    def file_of(self, window):
+        return bisect_right(self.offsets, window) - 1
+
+    def windows(self, start, end):
+        ''' The hashes, start lines and end lines of saved windows. '''
+        return (self.hashes[start:end], self.start_lines[start:end],
+                self.end_lines[start:end])
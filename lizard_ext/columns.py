@@ -0,0 +1,60 @@
+'''
+The metrics of all the functions kept column by column, one column per
+value, so that the totals, the averages and the threshold checks over
+all the functions don't need a getattr on every function each time.
+
+A column is an array of doubles from the array module. When NumPy is
+installed the operations on the columns are done by NumPy on the same
+memory.
+'''
+import itertools
+from array import array
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class FunctionColumns(object):
+
+    def __init__(self, functions):
+        self.functions = functions
+        self._columns = {}
+
+    def column(self, name):
+        ''' The values of one metric of all the functions, in order. '''
+        if name not in self._columns:
+            column = array('d', [getattr(f, name) for f in self.functions])
+            if numpy is not None:
+                column = numpy.frombuffer(column, dtype=numpy.float64) \
+                    if column else numpy.zeros(0)
+            self._columns[name] = column
+        return self._columns[name]
+
+    def total(self, name):
+        column = self.column(name)
+        return float(column.sum()) if numpy is not None else sum(column)
+
+    def average(self, name):
+        if not self.functions:
+            return 0
+        return self.total(name) / len(self.functions)
+
+    def exceeding(self, thresholds):
+        '''
+        The functions with any of the values over its threshold, in the
+        order of the functions.
+        '''
+        if numpy is not None:
+            over = numpy.zeros(len(self.functions), dtype=bool)
+            for name, limit in thresholds.items():
+                over |= self.column(name) > limit
+            indexes = numpy.flatnonzero(over)
+        else:
+            indexes = set()
+            for name, limit in thresholds.items():
+                indexes.update(itertools.compress(
+                    itertools.count(),
+                    map(float(limit).__lt__, self.column(name))))
+            indexes = sorted(indexes)
+        return [self.functions[i] for i in indexes]
@@ -2,43 +2,117 @@
 
 '''
 This module extends the default output formatting to include HTML.
+
+The report is rendered with jinja2's generate(), so it is written out
+while the files are still coming in. With --html-pages the report is
+split into one page for each source directory plus an index page.
 '''
 
 from __future__ import print_function
+import codecs
+import os
 import sys
 import datetime
+import pickle
+import tempfile
+
+_TEMPLATES = {}
 
 
 def html_output(result, options, *_):
     try:
-        from jinja2 import Template
+        import jinja2  # pylint: disable=W0611
     except ImportError:
         sys.stderr.write(
                 "HTML Output depends on jinja2. `pip install jinja2` first")
         sys.exit(2)
 
-    file_list = []
-    for source_file in result:
-        if source_file:
-            source_file_dict = {"filename": source_file.filename}
-            func_list = []
-            for source_function in source_file.function_list:
-                if source_function:
-                    source_function_dict = _create_dict(source_function)
-                    func_list.append(source_function_dict)
-                    source_file_dict["functions"] = func_list
-        file_list.append(source_file_dict)
-    output = Template(TEMPLATE).render(
+    context = dict(
             title='Lizard code complexity report',
             date=datetime.datetime.now().strftime('%Y-%m-%d %H:%M'),
-            thresholds=options.thresholds, files=file_list)
-    print(output)
+            thresholds=options.thresholds)
+    pages_dir = getattr(options, "html_pages", None)
+    if pages_dir:
+        write_html_pages(result, pages_dir, context)
+    else:
+        for chunk in _template(TEMPLATE).generate(
+                files=_files(result), **context):
+            sys.stdout.write(chunk)
+        print()
     return 0
 
 
-def _create_dict(obj):
+def write_html_pages(result, pages_dir, context):
+    '''
+    Writes a page for each directory of the source files and an
+    index.html linking to them into pages_dir. The files wait in a
+    temporary file until all of them are analyzed, because the files of
+    a directory may come in any order.
+    '''
+    if not os.path.isdir(pages_dir):
+        os.makedirs(pages_dir)
+    directories = {}
+    with tempfile.TemporaryFile() as spool:
+        for source_file in result:
+            if source_file:
+                directory = directories.setdefault(
+                    os.path.dirname(source_file.filename) or ".",
+                    {"offsets": [], "functions": 0, "warnings": 0})
+                directory["offsets"].append(spool.tell())
+                directory["functions"] += len(source_file.function_list)
+                directory["warnings"] += sum(
+                    1 for fun in source_file.function_list
+                    if _over_threshold(fun, context["thresholds"]))
+                pickle.dump(source_file, spool, pickle.HIGHEST_PROTOCOL)
+        pages = []
+        for number, name in enumerate(sorted(directories), 1):
+            directory = directories[name]
+            page = dict(
+                name=name, page="page%d.html" % number,
+                files=len(directory["offsets"]),
+                functions=directory["functions"],
+                warnings=directory["warnings"])
+            _write_page(
+                os.path.join(pages_dir, page["page"]),
+                _template(TEMPLATE).generate(
+                    files=_files(_load(spool, directory["offsets"])),
+                    directory=name, index="index.html", **context))
+            pages.append(page)
+    _write_page(
+        os.path.join(pages_dir, "index.html"),
+        _template(INDEX_TEMPLATE).generate(directories=pages, **context))
+
+
+def _template(source):
+    if source not in _TEMPLATES:
+        from jinja2 import Template
+        _TEMPLATES[source] = Template(source)
+    return _TEMPLATES[source]
+
+
+def _files(result):
+    for source_file in result:
+        if source_file:
+            yield {"filename": source_file.filename,
+                   "functions": source_file.function_list}
+
+
+def _load(spool, offsets):
+    for offset in offsets:
+        spool.seek(offset)
+        yield pickle.load(spool)
+
+
+def _over_threshold(fun, thresholds):
+    return any(getattr(fun, attr) > limit
+               for attr, limit in thresholds.items())
 
-    return obj.__dict__
+
+def _write_page(path, chunks):
+    with codecs.open(path, 'w', encoding='utf8') as page:
+        for chunk in chunks:
+            page.write(chunk)
+        page.write("\n")
 
 
 TEMPLATE = '''<!DOCTYPE HTML PUBLIC
@@ -91,7 +165,8 @@ TEMPLATE = '''<!DOCTYPE HTML PUBLIC
   </style>
  </head>
  <body>
-<h2>Code Complexity Report</h2>
+<h2>Code Complexity Report</h2>{% if index %}
+<h3>{{ directory }} (<a href="{{ index }}">all directories</a>)</h3>{% endif %}
 
 <center>
 
@@ -158,3 +233,63 @@ Cyclomatic complexity
 </html>
 
 '''
+
+
+INDEX_TEMPLATE = '''<!DOCTYPE HTML PUBLIC
+"-//W3C//DTD HTML 4.01 Transitional//EN"
+"http://www.w3.org/TR/html4/loose.dtd">
+<html>
+ <head>
+  <meta http-equiv="Content-Type" content="text/html; charset=utf-8">
+  <title>Code complexity report</title>
+  <style>
+    h2
+    {
+          text-align: center;
+    }
+    td, th
+        {
+          padding: 2px 10px;
+          font-family: sans-serif;
+          white-space: nowrap;
+        }
+    td.warnings
+        {
+      background-color: LightPink;
+        }
+  </style>
+ </head>
+ <body>
+<h2>Code Complexity Report</h2>
+
+<center>
+
+<table>
+<tr><th>Directory</th><th>Files</th><th>Functions</th>
+<th>Functions over the thresholds</th></tr>
+{% for directory in directories %}
+  <tr>
+    <td style="background-color:LightBlue;">
+      <a href="{{ directory.page }}">{{ directory.name }}</a></td>
+    <td>{{ directory.files }}</td>
+    <td>{{ directory.functions }}</td>
+    {% if directory.warnings %}
+       <td class="warnings">{{ directory.warnings }}</td>
+    {% else %}
+       <td>0</td>
+    {% endif %}
+  </tr>
+{% endfor %}
+</table>
+<center>
+
+<br>
+<table width="100%" border=0 cellspacing=0 cellpadding=0>
+    <tr><td class="footer">Generated by
+    <a href="http://www.lizard.ws/">Lizard</a> on {{ date }}
+    </td></tr>
+</table>
+ </body>
+</html>
+
+'''
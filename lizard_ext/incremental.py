@@ -0,0 +1,91 @@
+'''
+Incremental analysis.
+
+Instead of analyzing the whole tree, only the files changed since a git
+revision are analyzed. The new results are then merged into the results
+saved from a previous run (the baseline), so that the warnings and
+the totals still describe the whole code base.
+'''
+import os
+import pickle
+import subprocess
+import sys
+from .result_cache import result_signature
+
+
+def _git_files(*args):
+    try:
+        output = subprocess.check_output(("git",) + args)
+    except (OSError, subprocess.CalledProcessError):
+        sys.stderr.write("Error: failed to run 'git %s'\n" % " ".join(args))
+        sys.exit(2)
+    return [name for name in output.decode('utf-8').splitlines() if name]
+
+
+def changed_files(since):
+    '''
+    Return the files changed and the files deleted since the git revision,
+    relative to the current directory. Untracked files are counted as
+    changed.
+    '''
+    diff = ("diff", "--name-only", "--relative", "--no-renames")
+    changed = _git_files(*(diff + ("--diff-filter=d", since)))
+    changed += _git_files("ls-files", "--others", "--exclude-standard")
+    deleted = _git_files(*(diff + ("--diff-filter=D", since)))
+    return changed, deleted
+
+
+def files_under(paths, files):
+    roots = [os.path.abspath(path) for path in paths]
+    for name in files:
+        absolute = os.path.abspath(name)
+        if any(absolute == root or
+               absolute.startswith(root.rstrip(os.sep) + os.sep)
+               for root in roots):
+            yield name
+
+
+def load_baseline(path, extensions):
+    '''
+    Return the results saved in the baseline, or None when there is no
+    usable baseline: the file is missing or broken, or it was saved by
+    another lizard version or with other extensions.
+    '''
+    try:
+        with open(path, 'rb') as baseline:
+            signature, fileinfos = pickle.load(baseline)
+    except (IOError, OSError, EOFError, ValueError, TypeError,
+            AttributeError, ImportError, pickle.UnpicklingError):
+        return None
+    if signature != result_signature(extensions):
+        return None
+    return fileinfos
+
+
+def save_baseline(path, fileinfos, extensions):
+    with open(path, 'wb') as baseline:
+        pickle.dump((result_signature(extensions), fileinfos), baseline,
+                    pickle.HIGHEST_PROTOCOL)
+
+
+def merge_with_baseline(result, path, extensions, baseline=None,
+                        replaced=None):
+    '''
+    Yield the new results followed by the results from the baseline
+    that are still valid, and save them all as the new baseline.
+    If replaced is None, the whole baseline is replaced by the new
+    results. Otherwise only the given files are.
+    '''
+    merged = []
+    stale = set(os.path.abspath(name) for name in replaced or [])
+    for fileinfo in result:
+        if fileinfo:
+            stale.add(os.path.abspath(fileinfo.filename))
+            merged.append(fileinfo)
+        yield fileinfo
+    if replaced is not None:
+        for fileinfo in baseline or []:
+            if os.path.abspath(fileinfo.filename) not in stale:
+                merged.append(fileinfo)
+                yield fileinfo
+    save_baseline(path, merged, extensions)
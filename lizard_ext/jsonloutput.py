@@ -0,0 +1,60 @@
+'''
+This module writes the result as JSON Lines: one JSON object for each
+function, and with --jsonl-files also one for each file after its
+functions. Every object has a "type" of "function" or "file".
+
+The objects of a file are written and flushed as soon as the file is
+analyzed, so the output can be read while lizard is still running.
+All the fields the extensions declare in FUNCTION_INFO are included.
+'''
+import json
+import sys
+from collections import OrderedDict
+
+FUNCTION_FIELDS = (
+    "filename", "name", "long_name", "start_line", "end_line", "nloc",
+    "cyclomatic_complexity", "token_count", "parameter_count", "length",
+    "full_parameters")
+
+FILE_AVERAGES = ("nloc", "cyclomatic_complexity", "token_count")
+
+
+def _extension_fields(extensions):
+    fields = []
+    averages = []
+    for ext in extensions:
+        for name, info in sorted(getattr(ext, "FUNCTION_INFO", {}).items()):
+            if name not in FUNCTION_FIELDS + tuple(fields):
+                fields.append(name)
+            if "average_caption" in info and \
+                    name not in FILE_AVERAGES + tuple(averages):
+                averages.append(name)
+    return fields, averages
+
+
+def jsonl_output(result, options):
+    out = sys.stdout
+    fields, averages = _extension_fields(options.extensions)
+    function_fields = FUNCTION_FIELDS + tuple(fields)
+    file_averages = FILE_AVERAGES + tuple(averages)
+    with_files = getattr(options, "jsonl_files", False)
+    for source_file in result:
+        if not source_file:
+            continue
+        for fun in source_file.function_list:
+            record = OrderedDict([("type", "function")])
+            record.update(
+                (name, getattr(fun, name, None)) for name in function_fields)
+            out.write(json.dumps(record) + "\n")
+        if with_files:
+            record = OrderedDict([
+                ("type", "file"),
+                ("filename", source_file.filename),
+                ("nloc", source_file.nloc),
+                ("token_count", source_file.token_count),
+                ("function_count", len(source_file.function_list))])
+            record.update(
+                ("average_" + name, source_file.functions_average(name))
+                for name in file_averages)
+            out.write(json.dumps(record) + "\n")
+        out.flush()
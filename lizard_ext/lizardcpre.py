@@ -11,6 +11,8 @@ class LizardExtension(object):  # pylint: disable=R0903
     ordering_index = 0
 
     def __call__(self, tokens, reader):
+        context = reader.context
+
         def preprocess_tokens(tokens):
             else_count = 0
             if_stack = []
@@ -24,11 +26,9 @@ class LizardExtension(object):  # pylint: disable=R0903
                             else_count -= last.count("#else")
                             if last.startswith("#if"):
                                 break
-                    for _ in range(token.count('\n')):
-                        yield '\n'
+                    context.current_line += token.count('\n')
                 elif else_count:
-                    for _ in range(token.count('\n')):
-                        yield '\n'
+                    context.current_line += token.count('\n')
                 elif not (if_stack and if_stack[-1].startswith("#elif")):
                     yield token
 
@@ -5,7 +5,8 @@ within the code.
 
 
 class LizardExtension(object):  # pylint: disable=R0903
-    FUNCTION_INFO = {"dependency_count": {"caption": " dep cnt "}}
+    FUNCTION_INFO = {
+        "dependency_count": {"caption": " dep cnt ", "default": 0}}
 
     def __call__(self, tokens, reader):
         ignored_list = {','}
@@ -19,9 +20,6 @@ class LizardExtension(object):  # pylint: disable=R0903
         import_as_list = []
         import_as_counter = 0
         for token in tokens:
-            if not hasattr(reader.context.current_function,
-                           "dependency_count"):
-                reader.context.current_function.dependency_count = 0
             # this accounts for java, c, c++ and python's import
             if token in ("import", "#include"):
                 if import_as_list != []:
@@ -2,10 +2,21 @@
 Get Duplicated parameter lists
 '''
 from __future__ import print_function
+import hashlib
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import deque
 from itertools import groupby
-from .default_ordered_dict import DefaultOrderedDict
+from .clone_index import INDEX_TYPECODE, SpooledArray, clone_groups
+from .clone_store import CLONE_INDEX_NAME, StoredCloneIndex, \
+    save_clone_index
 from .extension_base import ExtensionBase
+from .result_cache import result_signature
+
+DEFAULT_DUPLICATE_MEMORY = 512  # in MB
 
 
 class CodeSnippet(object):
@@ -27,25 +38,81 @@ class CodeSnippet(object):
         pass
 
 
-class Sequence(object):
-    def __init__(self, start_line):
-        self.hash = ''
-        self.start_line = self.end_line = start_line
+# The hash of a window of tokens is a polynomial of the ids of its tokens
+# modulo a Mersenne prime, so it can be rolled along the tokens.
+HASH_MODULUS = (1 << 61) - 1
+HASH_BASE = 1000003
+HASH_TYPECODE = INDEX_TYPECODE
 
-    def append_token(self, unified_token, end_line):
-        self.hash += unified_token
-        self.end_line = end_line
+_TOKEN_IDS = {}
 
-    def __str__(self):
-        return "<%s-%s: %s>" % (self.start_line, self.end_line, self.hash)
 
-    def __repr__(self):
-        return str(self)
+def token_id(unified_token):
+    '''
+    The id of a unified token. It is derived from the token itself rather
+    than counted, so the ids from different processes are the same.
+    '''
+    try:
+        return _TOKEN_IDS[unified_token]
+    except KeyError:
+        digest = hashlib.md5(unified_token.encode("utf-8")).digest()
+        return _TOKEN_IDS.setdefault(
+            unified_token, struct.unpack("<Q", digest[:8])[0] % HASH_MODULUS)
+
+
+class HashNodes(object):
+    '''
+    The hashes of the windows of tokens, with the lines of the first and
+    the last token of each window, kept in arrays.
+    '''
+
+    def __init__(self):
+        self.hashes = array(HASH_TYPECODE)
+        self.start_lines = array('i')
+        self.end_lines = array('i')
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def append(self, code_hash, start_line, end_line):
+        self.hashes.append(code_hash)
+        self.start_lines.append(start_line)
+        self.end_lines.append(end_line)
+
+    def extend(self, other):
+        self.hashes.extend(other.hashes)
+        self.start_lines.extend(other.start_lines)
+        self.end_lines.extend(other.end_lines)
+
+
+class ContainingIntervals(object):
+    '''
+    Intervals kept so that whether one of them contains an interval can
+    be found with a binary search. An interval inside one already added
+    is not kept, so both the starts and the ends are in order.
+    '''
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def contains(self, start, end):
+        i = bisect_right(self.starts, start)
+        return i > 0 and self.ends[i - 1] >= end
+
+    def add(self, start, end):
+        if self.contains(start, end):
+            return
+        i = bisect_left(self.starts, start)
+        inside = bisect_right(self.ends, end, i)
+        self.starts[i:inside] = [start]
+        self.ends[i:inside] = [end]
 
 
 class InvolvingScope(object):
     def __init__(self, boundaries, keyfunc):
-        self.current_file_duplicates = []
+        # the first sequences of the duplicates, by their number
+        self.current_file_duplicates = {}
         self.dup_starts = set()
         self.boundaries = boundaries
         self.keyfunc = keyfunc
@@ -55,7 +122,8 @@ class InvolvingScope(object):
         self.dup_starts |= before_same
         if len(new_starts) > 1:
             for dup in self._duplicate_sequences(new_starts):
-                self.current_file_duplicates.append(dup)
+                self.current_file_duplicates.setdefault(
+                    len(dup), ContainingIntervals()).add(*dup[0])
                 yield dup
 
     def fun_yet_to_come2(self):
@@ -83,35 +151,38 @@ class InvolvingScope(object):
                 yield sequences
 
     def _full_inclusive_sequences(self, sequences):
-        return any(
-            len(dup) == len(sequences) and
-            dup[0][0] <= sequences[0][0] and
-            dup[0][1] >= sequences[0][1]
-            for dup in self.current_file_duplicates)
+        intervals = self.current_file_duplicates.get(len(sequences))
+        return intervals is not None and intervals.contains(*sequences[0])
 
 
 class DuplicateFinder(object):
-    def __init__(self, nodes, boundaries, **options):
-        collapse_repeat_tokens = options.get("collapse_repeat_tokens", 20)
+    def __init__(self, hashes, boundaries, **options):
+        self.collapse_repeat_tokens = options.get("collapse_repeat_tokens", 20)
         self.min_duplicate_tokens = options.get("min_duplicate_tokens", 0) * 2
         self.sample_size = options.get("sample_size", 0)
+        self.max_index_size = options.get("max_index_size")
+        self.pool = options.get("pool")
+        # don't let a block starting near the beginning of a file cut
+        # the windows at the end of the file before it
+        self.within_files = options.get("within_files", False)
         self.duplicate_token_count = 0
-        self.nodes = nodes
-        self.boundaries = set(boundaries + [len(nodes)])
-        self.hashed_node_indice = DefaultOrderedDict(list)
-        for i, node_hash in enumerate(n.hash for n in nodes):
-            if i in self.boundaries:
-                recent = deque([''] * collapse_repeat_tokens)
-            if node_hash not in recent:
-                self.hashed_node_indice[node_hash].append(i)
-            recent.append(node_hash)
-            recent.popleft()
+        self.unique_hash_count = 0
+        self.hashes = hashes
+        self.boundaries = set(boundaries + [len(hashes)])
+        self.file_starts = sorted(self.boundaries)
 
     def find_start_and_ends(self):
-        for i, same in enumerate(self.hashed_node_indice.values()):
+        groups = clone_groups(
+            self.hashes, self.boundaries, self.collapse_repeat_tokens,
+            self.max_index_size, self.pool)
+        for i, same in enumerate(groups):
+            self.unique_hash_count = i + 1
             if i in self.boundaries:
                 scope = InvolvingScope(self.boundaries, self._keyfunc)
-            before_same = set(n - self.sample_size for n in same)
+            before_same = set(
+                n - self.sample_size for n in same
+                if not self.within_files or
+                n - self.sample_size >= self._file_start(n))
             for dup in scope.same_beginning(
                     same, before_same):
                 token_count = len(dup) * \
@@ -123,22 +194,25 @@ class DuplicateFinder(object):
     def duplicate_rate(self):
         try:
             return self.duplicate_token_count * 1.0 / (
-                    len(self.nodes) +
+                    len(self.hashes) +
                     (len(self.boundaries) - 1) * (self.sample_size - 2))
         except ZeroDivisionError:
             return 0
 
     def unique_rate(self):
         try:
-            return len(self.hashed_node_indice) / len(self.nodes)
+            return self.unique_hash_count / len(self.hashes)
         except ZeroDivisionError:
             return 0
 
+    def _file_start(self, index):
+        return self.file_starts[bisect_right(self.file_starts, index) - 1]
+
     def _keyfunc(self, seq):
         try:
-            return self.nodes[seq[1]].hash
+            return self.hashes[seq[1]]
         except IndexError:
-            return ''
+            return -1
 
 
 class NestingStackWithUnifiedTokens(object):
@@ -202,49 +276,190 @@ class NestingStackWithUnifiedTokens(object):
         self.previous_token = token
 
     def samples(self):
-        buf = deque()
-        for unified_token, current_line in self.unified_tokens:
-            buf.append(Sequence(current_line))
-            for code_hash in buf:
-                code_hash.append_token(unified_token, current_line)
-            if len(buf) > self.SAMPLE_SIZE:
-                yield buf.popleft()
+        '''
+        The hash nodes of every window of SAMPLE_SIZE + 1 tokens. The hash
+        is rolled from one window to the next.
+        '''
+        nodes = HashNodes()
+        window = self.SAMPLE_SIZE + 1
+        leaving_power = pow(HASH_BASE, window - 1, HASH_MODULUS)
+        ids = [token_id(token) for token, _ in self.unified_tokens]
+        code_hash = 0
+        for i, (_, current_line) in enumerate(self.unified_tokens):
+            if i >= window:
+                code_hash -= ids[i - window] * leaving_power
+            code_hash = (code_hash * HASH_BASE + ids[i]) % HASH_MODULUS
+            if i >= window - 1:
+                nodes.append(
+                    code_hash,
+                    self.unified_tokens[i - window + 1][1],
+                    current_line)
+        return nodes
+
+
+def _covered(ranges):
+    ''' The number of positions in any of the (start, end) ranges. '''
+    count = 0
+    covered_to = 0
+    for start, end in sorted(ranges):
+        count += max(0, end - max(start, covered_to))
+        covered_to = max(covered_to, end)
+    return count
 
 
 class LizardExtension(ExtensionBase):
 
     def __init__(self, context=None):
-        self.nodes = []
-        self.fileinfos = []
+        self.memory = DEFAULT_DUPLICATE_MEMORY * 1024 * 1024
+        self.threads = 1
+        self.index_path = self.signature = None
+        self.changes_only = False
+        self.hashes = self.start_lines = self.end_lines = None
+        self.file_offsets = []
+        self.boundaries = []
         self.saved_duplicate_rate = None
         self.saved_unique_rate = None
         super(LizardExtension, self).__init__(context)
 
+    @staticmethod
+    def set_args(parser):
+        parser.add_argument(
+            "--duplicate-memory",
+            help='''Memory in MB the duplicate index can take before it
+            moves to temporary files. The default value is %d.
+            ''' % DEFAULT_DUPLICATE_MEMORY,
+            type=int,
+            dest="duplicate_memory",
+            default=DEFAULT_DUPLICATE_MEMORY)
+
+    def apply_args(self, options):
+        self.memory = options.duplicate_memory * 1024 * 1024
+        self.threads = options.working_threads
+        if options.cache_dir:
+            self.index_path = os.path.join(
+                options.cache_dir, CLONE_INDEX_NAME)
+            self.signature = result_signature(options.extensions)
+        self.changes_only = bool(options.since)
+
     def __call__(self, tokens, reader):
         token_unifier = reader.context.decorate_nesting_stack(
                 NestingStackWithUnifiedTokens)
         for token in tokens:
             token_unifier.enqueue_token(token, reader.context.current_line)
             yield token
-        reader.context.fileinfo.hash_nodes = list(token_unifier.samples())
+        reader.context.fileinfo.hash_nodes = token_unifier.samples()
 
     def cross_file_process(self, fileinfos):
+        self.hashes = SpooledArray(HASH_TYPECODE, self.memory // 8)
+        self.start_lines = SpooledArray('i', self.memory // 16)
+        self.end_lines = SpooledArray('i', self.memory // 16)
         for fileinfo in fileinfos:
-            self.fileinfos.append((len(self.nodes), fileinfo))
-            self.nodes += fileinfo.hash_nodes
+            nodes = fileinfo.hash_nodes
+            self.file_offsets.append((len(self.hashes), fileinfo.filename))
+            self.hashes.extend(nodes.hashes)
+            self.start_lines.extend(nodes.start_lines)
+            self.end_lines.extend(nodes.end_lines)
             yield fileinfo
+        if self.index_path and not self.changes_only:
+            save_clone_index(
+                self.index_path, self.signature, self.file_offsets,
+                self.hashes.view(),
+                (self.start_lines.view(), self.end_lines.view()),
+                self.memory // 2)
 
     def get_duplicates(self, min_duplicate_tokens=70):
-        boundaries = [info[0] for info in self.fileinfos]
+        changed = None
+        if self.index_path and self.changes_only and self.hashes:
+            changed = self._add_saved_windows_in_common()
+        self.boundaries = [offset for offset, _ in self.file_offsets]
+        pool = self._start_pool()
+        hashes = self.hashes.view() if self.hashes else []
         duplicate_finder = DuplicateFinder(
-                self.nodes,
-                boundaries,
+                hashes,
+                self.boundaries,
                 min_duplicate_tokens=min_duplicate_tokens,
-                sample_size=NestingStackWithUnifiedTokens.SAMPLE_SIZE)
-        for start_and_ends in duplicate_finder.find_start_and_ends():
-            yield self._create_code_snippets(start_and_ends)
-        self.saved_duplicate_rate = duplicate_finder.duplicate_rate()
-        self.saved_unique_rate = duplicate_finder.unique_rate()
+                sample_size=NestingStackWithUnifiedTokens.SAMPLE_SIZE,
+                max_index_size=self.memory // 2,
+                pool=pool,
+                within_files=changed is not None)
+        start_lines = self.start_lines.view() if self.start_lines else []
+        end_lines = self.end_lines.view() if self.end_lines else []
+        changed_ranges = []
+        try:
+            for start_and_ends in duplicate_finder.find_start_and_ends():
+                if changed is not None:
+                    in_change = [(start, end) for start, end in start_and_ends
+                                 if start < changed[0]]
+                    if not in_change:
+                        continue
+                    changed_ranges.extend(
+                        (start, end + duplicate_finder.sample_size + 1)
+                        for start, end in in_change)
+                yield self._create_code_snippets(
+                    start_and_ends, start_lines, end_lines)
+        finally:
+            if pool is not None:
+                pool.close()
+        if changed is None:
+            self.saved_duplicate_rate = duplicate_finder.duplicate_rate()
+            self.saved_unique_rate = duplicate_finder.unique_rate()
+        else:
+            windows, files = changed
+            self.saved_duplicate_rate = _covered(changed_ranges) * 1.0 / (
+                windows + files * duplicate_finder.sample_size)
+            self.saved_unique_rate = \
+                len(set(hashes[:windows])) * 1.0 / windows
+
+    def _add_saved_windows_in_common(self):
+        '''
+        Adds the runs of windows from the saved clone index that share a
+        hash with the changed files, each run as a file of its own. The
+        duplicates found are then only the ones that the change brings
+        in, and the rates are of the changed files. Gives back the number
+        of windows and of files that were changed.
+        '''
+        try:
+            index = StoredCloneIndex(self.index_path, self.signature)
+        except (EnvironmentError, ValueError):
+            sys.stderr.write(
+                "Warning: no usable clone index in the cache directory; "
+                "only the changed files are checked for duplicates.\n")
+            return None
+        changed = (len(self.hashes), len(self.file_offsets))
+        analyzed = set(
+            os.path.abspath(name) for _, name in self.file_offsets)
+        runs = []
+        for window in index.windows_with(self.hashes.view()):
+            file_index = index.file_of(window)
+            if runs and runs[-1][1] == window and \
+                    runs[-1][2] == file_index:
+                runs[-1][1] = window + 1
+            else:
+                runs.append([window, window + 1, file_index])
+        for start, end, file_index in runs:
+            filename = index.filenames[file_index]
+            if os.path.abspath(filename) in analyzed or \
+                    not os.path.exists(filename):
+                continue
+            hashes, start_lines, end_lines = index.windows(start, end)
+            self.file_offsets.append((len(self.hashes), filename))
+            self.hashes.extend(hashes)
+            self.start_lines.extend(start_lines)
+            self.end_lines.extend(end_lines)
+        return changed
+
+    def _start_pool(self):
+        '''
+        Worker processes to group the hashes with, when lizard runs
+        with more than one working thread.
+        '''
+        if self.threads <= 1 or not self.hashes:
+            return None
+        try:
+            from lizard import AnalysisPool
+            return AnalysisPool(self.threads)
+        except ImportError:
+            return None
 
     def duplicate_rate(self):
         return self.saved_duplicate_rate
@@ -252,21 +467,17 @@ class LizardExtension(ExtensionBase):
     def unique_rate(self):
         return self.saved_unique_rate
 
-    def _create_code_snippets(self, start_and_ends):
+    def _create_code_snippets(self, start_and_ends, start_lines, end_lines):
         return [
             CodeSnippet(
-                self.nodes[start].start_line,
-                self.nodes[end].end_line,
-                self._get_fileinfo_by_token_index(start).filename)
+                start_lines[start],
+                end_lines[end],
+                self._get_filename_by_token_index(start))
             for start, end in start_and_ends]
 
-    def _get_fileinfo_by_token_index(self, index):
-        last_fileinfo = (-1, None)
-        for fileinfo in self.fileinfos:
-            if fileinfo[0] > index:
-                break
-            last_fileinfo = fileinfo
-        return last_fileinfo[1]
+    def _get_filename_by_token_index(self, index):
+        return self.file_offsets[
+            bisect_right(self.boundaries, index) - 1][1]
 
     def print_result(self):
         print("Duplicates")
@@ -12,10 +12,12 @@ class LizardExtension(ExtensionBase):
     FUNCTION_INFO = {
         "parameter_list_duplicates": {
             "caption": " dup_param_list ",
-            "average_caption": " avg_dpl "},
+            "average_caption": " avg_dpl ",
+            "default": 0},
         "parameter_list_duplicated_in_files": {
             "caption": " dup_param_list_f ",
-            "average_caption": " avg_dpl_f "},
+            "average_caption": " avg_dpl_f ",
+            "default": 0},
     }
 
     def __init__(self, context=None):
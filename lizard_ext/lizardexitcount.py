@@ -6,12 +6,12 @@ in every function.
 
 class LizardExtension:  # pylint: disable=R0903
 
-    FUNCTION_INFO = {"exit_count": {"caption": "exits"}}
+    FUNCTION_INFO = {"exit_count": {"caption": "exits", "default": None}}
 
     def __call__(self, tokens, reader):
         first_return = False
         for token in tokens:
-            if not hasattr(reader.context.current_function, "exit_count"):
+            if reader.context.current_function.exit_count is None:
                 reader.context.current_function.exit_count = 1
                 first_return = True
             if token == "return":
@@ -44,14 +44,13 @@ class LizardExtension(ExtensionBase):
             "caption": " general_fan_out ",
             "average_caption": " avg_general_fan_out "}
     }
+    FUNCTION_FIELDS = {"tokens": list}
 
     def __init__(self, context=None):
         self.all_methods = {}
         super(LizardExtension, self).__init__(context)
 
     def _state_global(self, token):
-        if not hasattr(self.context.current_function, 'tokens'):
-            self.context.current_function.tokens = list()
         self.context.current_function.tokens.append(token)
 
     def cross_file_process(self, fileinfos):
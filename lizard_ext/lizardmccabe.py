@@ -26,7 +26,7 @@ class LizardExtension(ExtensionBase):  # pylint: disable=R0903
     def _after_a_case(self, token):
         if token == "case":
             self.context.add_condition(-1)
-            if hasattr(self.context, "add_nd_condition"):
+            if hasattr(self.context.current_function, "nesting_depth"):
                 self.context.add_nd_condition(-1)
             self.next(self._in_case)
         else:
@@ -11,10 +11,12 @@ class LizardExtension(object):  # pylint: disable=R0903
         for token in tokens:
             if token == 'switch':
                 reader.context.add_condition()
-                if hasattr(reader.context, "add_nd_condition"):
+                if hasattr(reader.context.current_function,
+                           "nesting_depth"):
                     reader.context.add_nd_condition()
             elif token == 'case':
                 reader.context.add_condition(-1)
-                if hasattr(reader.context, "add_nd_condition"):
+                if hasattr(reader.context.current_function,
+                           "nesting_depth"):
                     reader.context.add_nd_condition(-1)
             yield token
@@ -2,7 +2,7 @@
 This is an extension of lizard, that counts the 'Nesting Depth'
 in every function.
 """
-from lizard import FileInfoBuilder, FunctionInfo
+from lizard import FileInfoBuilder
 
 DEFAULT_ND_THRESHOLD = 7
 
@@ -12,7 +12,12 @@ class LizardExtension(object):  # pylint: disable=R0903
     FUNCTION_INFO = {
             "max_nesting_depth": {
                 "caption": "  ND  ",
-                "average_caption": " Avg.ND "}}
+                "average_caption": " Avg.ND ",
+                "default": 0}}
+    FUNCTION_FIELDS = {
+            "nesting_depth": 0,
+            "hidden_bracket": 0,
+            "bracket_loop": False}
 
     @staticmethod
     def set_args(parser):
@@ -112,22 +117,4 @@ def patch(frm, accept_class):
         setattr(accept_class, method, get_method(frm, method))
 
 
-def patch_append_method(frm, accept_class, method_name):
-    old_method = get_method(accept_class, method_name)
-
-    def appended(*args, **kargs):
-        old_method(*args, **kargs)
-        frm(*args, **kargs)
-
-    setattr(accept_class, method_name, appended)
-
-
-def _init_nesting_depth_data(self, *_):
-    self.nesting_depth = 0
-    self.max_nesting_depth = 0
-    self.hidden_bracket = 0
-    self.bracket_loop = False
-
-
 patch(NDFileInfoAddition, FileInfoBuilder)
-patch_append_method(_init_nesting_depth_data, FunctionInfo, "__init__")
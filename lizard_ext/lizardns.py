@@ -9,8 +9,6 @@ The code borrows heavily from implementation of Nesting Depth extension
 originally written by Mehrdad Meh and Terry Yin.
 """
 
-from lizard import FunctionInfo
-from lizard_ext.lizardnd import patch_append_method
 from lizard_languages.code_reader import CodeStateMachine
 from .extension_base import ExtensionBase
 
@@ -46,7 +44,8 @@ class LizardExtension(ExtensionBase):  # pylint: disable=R0903
     for control block **starting** and **closing** purposes.
     """
 
-    FUNCTION_INFO = {"max_nested_structures": {"caption": "  NS  "}}
+    FUNCTION_INFO = {
+        "max_nested_structures": {"caption": "  NS  ", "default": 0}}
 
     # TODO: Delegate this to language readers  # pylint: disable=fixme
     structures = set(['if', 'else', 'elif', 'for', 'foreach', 'while',
@@ -72,16 +71,10 @@ class LizardExtension(ExtensionBase):  # pylint: disable=R0903
     def pile_up_within_block(self):
         self.structure_piles[-1] += 1
         cur_level = sum(self.structure_piles)
-        # Is there a path around _state_global?
-        if not hasattr(self.context.current_function, "max_nested_structures"):
-            self.context.current_function.max_nested_structures = 0
         if self.context.current_function.max_nested_structures < cur_level:
             self.context.current_function.max_nested_structures = cur_level
 
     def _state_global(self, token):
-        # Necessary to prevent functions without nested blocks to fail
-        if not hasattr(self.context.current_function, "max_nested_structures"):
-            self.context.current_function.max_nested_structures = 0
         if token == '{':
             self.structure_piles.append(0)
         elif token in ';}':
@@ -104,10 +97,3 @@ class LizardExtension(ExtensionBase):  # pylint: disable=R0903
             self.structure_piles[-1] = 0
         self._state = self._state_global
         self._state(token)
-
-
-def _init_nested_structure_data(self, *_):
-    self.max_nested_structures = 0
-
-
-patch_append_method(_init_nested_structure_data, FunctionInfo, "__init__")
@@ -5,7 +5,8 @@ This is an extension of lizard, that counts the statements in a function
 
 class LizardExtension:  # pylint: disable=R0903
 
-    FUNCTION_INFO = {"statement_count": {"caption": "statements"}}
+    FUNCTION_INFO = {
+        "statement_count": {"caption": "statements", "default": 0}}
 
     def __call__(self, tokens, reader):
         c_family = 'c' in reader.language_names or \
@@ -14,9 +15,6 @@ class LizardExtension:  # pylint: disable=R0903
         block_count = 0
         for token in tokens:
             if c_family:
-                if not hasattr(reader.context.current_function,
-                               "statement_count"):
-                    reader.context.current_function.statement_count = 0
                 if token in [';', 'if', 'for', 'while', ':', 'switch']:
                     reader.context.current_function.statement_count += 1
                 if token == "{":
@@ -0,0 +1,120 @@
+'''
+A persistent cache of the analysis result of each source file.
+
+The cache is content addressed. The key of an entry is the hash of the
+source code together with everything else that can change the result:
+the lizard version, the language reader and the extensions in use.
+A cached FileInformation can therefore be reused by any file with the
+same content, no matter where it is or when it was analyzed.
+
+The size of the cache directory is bounded. When it grows over the
+limit, the least recently used entries are removed.
+'''
+import hashlib
+import os
+import pickle
+import tempfile
+from lizard_languages import get_reader_for, CLikeReader
+from .version import version
+
+DEFAULT_CACHE_SIZE = 512  # in MB
+
+
+def _extension_name(ext):
+    if hasattr(ext, "__name__"):
+        return ext.__module__ + "." + ext.__name__
+    return ext.__class__.__module__ + "." + ext.__class__.__name__
+
+
+def result_signature(extensions):
+    '''
+    Everything besides the code that the result depends on: the lizard
+    version and the extensions in use.
+    '''
+    return "|".join([version] + [_extension_name(ext) for ext in extensions])
+
+
+class ResultCache(object):
+
+    def __init__(self, cache_dir, extensions, max_size=DEFAULT_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size * 1024 * 1024
+        self.signature = result_signature(extensions)
+
+    def key(self, filename, code):
+        reader = get_reader_for(filename) or CLikeReader
+        digest = hashlib.sha1(
+            (self.signature + "|" + reader.__name__ + "|").encode('utf-8'))
+        digest.update(code.encode('utf-8', 'ignore'))
+        return digest.hexdigest()
+
+    def fetch(self, filename, code, analyze):
+        '''
+        Return the cached result of the code if there is one,
+        otherwise analyze it and save the result.
+        '''
+        key = self.key(filename, code)
+        fileinfo = self.get(key)
+        if fileinfo is None:
+            fileinfo = analyze(filename, code)
+            self.put(key, fileinfo)
+            return fileinfo
+        fileinfo.filename = filename
+        for fun in fileinfo.function_list:
+            fun.filename = filename
+        return fileinfo
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key[2:])
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as entry:
+                fileinfo = pickle.load(entry)
+            os.utime(path, None)
+            return fileinfo
+        except (IOError, OSError, EOFError, ValueError, pickle.PickleError):
+            return None
+
+    def put(self, key, fileinfo):
+        path = self._path(key)
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            handle, temp = tempfile.mkstemp(dir=os.path.dirname(path))
+        except (IOError, OSError):
+            return
+        try:
+            with os.fdopen(handle, 'wb') as entry:
+                pickle.dump(fileinfo, entry, pickle.HIGHEST_PROTOCOL)
+            os.rename(temp, path)
+        except (IOError, OSError, TypeError, AttributeError,
+                pickle.PickleError):
+            os.remove(temp)
+
+    def entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for filename in files:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def prune(self):
+        '''
+        Remove the least recently used entries until the cache fits
+        in its size limit.
+        '''
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,255 @@
+'''
+A compact binary file of the result of a whole run, to keep it and read
+it again later without parsing XML or running lizard again
+(lizard --save FILE / lizard --load FILE).
+
+The metrics of the functions are kept column by column, one fixed width
+value per function, and all the strings are kept once in a string
+table. The file is read through mmap, so the functions of one file can
+be fetched without reading the rest.
+
+Layout, all little-endian:
+
+    header      MAGIC, FORMAT_VERSION, the counts and the offsets of
+                the sections below
+    strings     n + 1 uint64 offsets, then the utf-8 bytes of the strings
+    files       for each file: filename, nloc, token count, its first
+                function and its number of functions
+    columns     for each column: its name and kind, then the values of
+                every column for all the functions, one after another
+    parameters  the strings of the parameters of all the functions
+'''
+import mmap
+import struct
+import sys
+from array import array
+
+MAGIC = b"LZRB"
+FORMAT_VERSION = 1
+
+# magic, version, numbers of strings, files, functions, columns and
+# parameters, offsets of the strings, files, columns and parameters
+_HEADER = struct.Struct("<4sIIIIIIQQQQ")
+_FILE = struct.Struct("<IqqII")
+_COLUMN = struct.Struct("<Ic3x")
+
+# the kinds of columns, and the typecode and count of their values
+_STRING, _INT, _FLOAT, _STRINGS = b"s", b"i", b"f", b"l"
+_TYPECODES = {_STRING: 'I', _INT: 'i', _FLOAT: 'd', _STRINGS: 'I'}
+
+STRING_COLUMNS = ("name", "long_name")
+NUMBER_COLUMNS = (
+    "cyclomatic_complexity", "nloc", "token_count", "start_line",
+    "end_line", "top_nesting_level", "length", "fan_in", "fan_out",
+    "general_fan_out")
+
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def _to_bytes(values):
+    values = _little_endian(values)
+    return values.tobytes() if hasattr(values, "tobytes") \
+        else values.tostring()
+
+
+def _from_bytes(typecode, data):
+    values = array(typecode)
+    if hasattr(values, "frombytes"):
+        values.frombytes(data)
+    else:
+        values.fromstring(data)
+    return _little_endian(values)
+
+
+def save_result(result, path, extensions):
+    '''
+    Passes the result through as it is and writes it to path once all
+    of it has passed.
+    '''
+    writer = ResultFileWriter(extensions)
+    for fileinfo in result:
+        if fileinfo:
+            writer.add(fileinfo)
+        yield fileinfo
+    writer.save(path)
+
+
+class ResultFileWriter(object):
+    '''
+    Collects the result into arrays and the string table. The
+    FileInformation objects themselves are not kept.
+    '''
+
+    def __init__(self, extensions):
+        self.strings = {}
+        self.files = []
+        self.columns = [(name, _STRING, array('I')) for name in STRING_COLUMNS]
+        names = list(NUMBER_COLUMNS)
+        for ext in extensions:
+            names.extend(sorted(
+                name for name in getattr(ext, "FUNCTION_INFO", {})
+                if name not in names))
+        self.columns.extend((name, _INT, array('i')) for name in names)
+        self.parameter_offsets = array('I', [0])
+        self.parameters = array('I')
+
+    def _string(self, text):
+        return self.strings.setdefault(text, len(self.strings))
+
+    def add(self, fileinfo):
+        self.files.append((
+            self._string(fileinfo.filename), fileinfo.nloc,
+            fileinfo.token_count, len(self.parameter_offsets) - 1,
+            len(fileinfo.function_list)))
+        for fun in fileinfo.function_list:
+            self._add_function(fun)
+
+    def _add_function(self, fun):
+        for index, (name, kind, values) in enumerate(self.columns):
+            value = getattr(fun, name, None)
+            if kind == _STRING:
+                values.append(self._string(value))
+                continue
+            if kind == _INT:
+                try:
+                    values.append(value)
+                    continue
+                except (TypeError, OverflowError):
+                    values = array('d', values)
+                    self.columns[index] = (name, _FLOAT, values)
+            values.append(float("nan") if value is None else value)
+        self.parameters.extend(
+            self._string(param) for param in fun.full_parameters)
+        self.parameter_offsets.append(len(self.parameters))
+
+    def save(self, path):
+        columns = self.columns + [
+            ("full_parameters", _STRINGS, self.parameter_offsets)]
+        for name, _, _ in columns:
+            self._string(name)
+        encoded = [text.encode("utf-8") for text in
+                   sorted(self.strings, key=self.strings.get)]
+        offsets = [0]
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        with open(path, "wb") as out:
+            out.write(b"\0" * _HEADER.size)
+            strings_at = out.tell()
+            out.write(struct.pack("<%dQ" % len(offsets), *offsets))
+            out.write(b"".join(encoded))
+            files_at = out.tell()
+            for record in self.files:
+                out.write(_FILE.pack(*record))
+            columns_at = out.tell()
+            for name, kind, _ in columns:
+                out.write(_COLUMN.pack(self.strings[name], kind))
+            for _, _, values in columns:
+                out.write(_to_bytes(values))
+            parameters_at = out.tell()
+            out.write(_to_bytes(self.parameters))
+            out.seek(0)
+            out.write(_HEADER.pack(
+                MAGIC, FORMAT_VERSION, len(encoded), len(self.files),
+                len(self.parameter_offsets) - 1, len(columns),
+                len(self.parameters), strings_at, files_at, columns_at,
+                parameters_at))
+
+
+class ResultFile(object):
+    '''
+    A result file read through mmap. Iterating gives a FileInformation
+    for each file; fileinfo(index) and find(filename) read only the
+    file asked for.
+    '''
+
+    def __init__(self, path):
+        with open(path, "rb") as source:
+            self.map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map.size() < _HEADER.size:
+            raise ValueError("'%s' is not a lizard result file" % path)
+        (magic, version, string_count, self.file_count, self.function_count,
+         column_count, _, self.strings_at, self.files_at, columns_at,
+         self.parameters_at) = _HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("'%s' is not a lizard result file" % path)
+        self.texts_at = self.strings_at + 8 * (string_count + 1)
+        self.columns = []
+        data_at = columns_at + _COLUMN.size * column_count
+        for index in range(column_count):
+            name, kind = _COLUMN.unpack_from(
+                self.map, columns_at + _COLUMN.size * index)
+            self.columns.append((self.string(name), kind, data_at))
+            size = array(_TYPECODES[kind]).itemsize
+            data_at += size * (
+                self.function_count + (1 if kind == _STRINGS else 0))
+        self._index = None
+
+    def close(self):
+        self.map.close()
+
+    def __len__(self):
+        return self.file_count
+
+    def __iter__(self):
+        for index in range(self.file_count):
+            yield self.fileinfo(index)
+
+    def string(self, index):
+        start, end = struct.unpack_from(
+            "<QQ", self.map, self.strings_at + 8 * index)
+        return self.map[self.texts_at + start:
+                        self.texts_at + end].decode("utf-8")
+
+    def find(self, filename):
+        ''' The FileInformation of filename, or None. '''
+        if self._index is None:
+            self._index = dict(
+                (self.string(self._file_record(index)[0]), index)
+                for index in range(self.file_count))
+        index = self._index.get(filename)
+        return None if index is None else self.fileinfo(index)
+
+    def _file_record(self, index):
+        return _FILE.unpack_from(self.map, self.files_at + _FILE.size * index)
+
+    def _values(self, kind, data_at, first, count):
+        typecode = _TYPECODES[kind]
+        size = array(typecode).itemsize
+        return _from_bytes(typecode, self.map[
+            data_at + size * first:data_at + size * (first + count)])
+
+    def fileinfo(self, index):
+        from lizard import FileInformation, FunctionInfo
+        filename, nloc, token_count, first, count = self._file_record(index)
+        fileinfo = FileInformation(self.string(filename), nloc)
+        fileinfo.token_count = token_count
+        functions = [FunctionInfo("", fileinfo.filename)
+                     for _ in range(count)]
+        for name, kind, data_at in self.columns:
+            if kind == _STRINGS:
+                self._set_strings(functions, name, data_at, first)
+                continue
+            values = self._values(kind, data_at, first, count)
+            for fun, value in zip(functions, values):
+                if kind == _STRING:
+                    value = self.string(value)
+                elif value != value:
+                    value = None
+                setattr(fun, name, value)
+        fileinfo.function_list = functions
+        return fileinfo
+
+    def _set_strings(self, functions, name, data_at, first):
+        offsets = self._values(_STRINGS, data_at, first, len(functions) + 1)
+        strings = self._values(
+            _STRING, self.parameters_at, offsets[0], offsets[-1] - offsets[0])
+        for number, fun in enumerate(functions):
+            setattr(fun, name, [
+                self.string(strings[i]) for i in range(
+                    offsets[number] - offsets[0],
+                    offsets[number + 1] - offsets[0])])
@@ -2,166 +2,151 @@
 Thanks for Holy Wen from Nokia Siemens Networks to let me use his code
 to put the result into xml file that is compatible with cppncss.
 Jenkins has plugin for cppncss format result to display the diagram.
+
+The XML is written as the files come in, in the same layout as
+xml.dom.minidom's toprettyxml. The items of the file measure wait in a
+temporary file until all the functions are written.
 '''
+import tempfile
+from xml.sax.saxutils import escape
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+HEAD = (
+    '<?xml version="1.0" ?>\n'
+    '<?xml-stylesheet type="text/xsl" ' +
+    'href="https://raw.githubusercontent.com' +
+    '/terryyin/lizard/master/lizard.xsl"?>\n'
+    '<cppncss>\n')
+
+SPOOL_SIZE = 1024 * 1024
 
 
 def xml_output(all_result, verbose):
-    result = all_result.result
-    import xml.dom.minidom
+    out = StringIO()
+    write_xml(all_result.result, verbose, out)
+    return out.getvalue()
+
 
-    impl = xml.dom.minidom.getDOMImplementation()
-    doc = impl.createDocument(None, "cppncss", None)
-    root = doc.documentElement
+def write_xml(result, verbose, out):
+    out.write(HEAD)
+    with tempfile.SpooledTemporaryFile(SPOOL_SIZE) as file_items:
+        files = _write_function_measure(out, result, verbose, file_items)
+        file_items.seek(0)
+        _write_file_measure(out, files, file_items)
+    out.write('</cppncss>\n')
 
-    processing_instruction = doc.createProcessingInstruction(
-        'xml-stylesheet',
-        'type="text/xsl" ' +
-        'href="https://raw.githubusercontent.com' +
-        '/terryyin/lizard/master/lizard.xsl"')
-    doc.insertBefore(processing_instruction, root)
 
-    root.appendChild(_create_function_measure(doc, result, verbose))
-    root.appendChild(_create_file_measure(doc, result, all_result))
+class _FileTotals(object):  # pylint: disable=R0903
 
-    return doc.toprettyxml()
+    def __init__(self):
+        self.count = 0
+        self.nloc = 0
+        self.ccn = 0
+        self.functions = 0
+        self.function_nloc = 0
 
 
-def _create_function_measure(doc, result, verbose):
-    measure = doc.createElement("measure")
-    measure.setAttribute("type", "Function")
-    measure.appendChild(_create_labels(doc, ["Nr.", "NCSS", "CCN"]))
+def _write_function_measure(out, result, verbose, file_items):
+    out.write('\t<measure type="Function">\n')
+    _write_labels(out, ["Nr.", "NCSS", "CCN"])
 
     number = 0
     total_func_ncss = 0
     total_func_ccn = 0
+    files = _FileTotals()
 
     for source_file in result:
         if source_file:
             file_name = source_file.filename
+            file_ccn = 0
             for func in source_file.function_list:
                 number += 1
                 total_func_ncss += func.nloc
                 total_func_ccn += func.cyclomatic_complexity
-                measure.appendChild(
-                    _create_function_item(
-                        doc, number, file_name, func, verbose))
+                file_ccn += func.cyclomatic_complexity
+                _write_function_item(out, number, file_name, func, verbose)
 
             if number != 0:
-                measure.appendChild(
-                    _create_labeled_value_item(
-                        doc, 'average', "NCSS", str(total_func_ncss / number)))
-                measure.appendChild(
-                    _create_labeled_value_item(
-                        doc, 'average', "CCN", str(total_func_ccn / number)))
-    return measure
-
-
-def _create_file_measure(doc, result, all_result):
-    all_in_one = all_result.as_fileinfo()
-    measure = doc.createElement("measure")
-    measure.setAttribute("type", "File")
-    measure.appendChild(
-        _create_labels(doc, ["Nr.", "NCSS", "CCN", "Functions"]))
-
-    file_nr = 0
-    file_total_ccn = 0
-    file_total_funcs = 0
-
-    for source_file in result:
-        file_nr += 1
-        file_total_ccn += source_file.CCN
-        file_total_funcs += len(source_file.function_list)
-        measure.appendChild(
-            _create_file_node(doc, source_file, file_nr))
-
-    if file_nr != 0:
-        file_summary = [("NCSS", all_in_one.nloc / file_nr),
-                        ("CCN", file_total_ccn / file_nr),
-                        ("Functions", file_total_funcs / file_nr)]
+                _write_labeled_value_item(
+                    out, 'average', "NCSS", str(total_func_ncss / number))
+                _write_labeled_value_item(
+                    out, 'average', "CCN", str(total_func_ccn / number))
+
+            files.count += 1
+            files.nloc += source_file.nloc
+            files.ccn += file_ccn
+            files.functions += len(source_file.function_list)
+            file_items.write(_file_item(
+                source_file, files.count, file_ccn).encode("utf-8"))
+    out.write('\t</measure>\n')
+    files.function_nloc = total_func_ncss
+    return files
+
+
+def _write_file_measure(out, files, file_items):
+    out.write('\t<measure type="File">\n')
+    _write_labels(out, ["Nr.", "NCSS", "CCN", "Functions"])
+
+    for item in file_items:
+        out.write(item.decode("utf-8"))
+
+    if files.count != 0:
+        file_summary = [("NCSS", files.nloc / files.count),
+                        ("CCN", files.ccn / files.count),
+                        ("Functions", files.functions / files.count)]
         for key, val in file_summary:
-            measure.appendChild(
-                _create_labeled_value_item(doc, 'average', key, val))
+            _write_labeled_value_item(out, 'average', key, val)
 
-    summary = [("NCSS", all_in_one.nloc),
-               ("CCN", file_total_ccn),
-               ("Functions", file_total_funcs)]
+    summary = [("NCSS", files.nloc),
+               ("CCN", files.ccn),
+               ("Functions", files.functions)]
     for key, val in summary:
-        measure.appendChild(_create_labeled_value_item(doc, 'sum', key, val))
+        _write_labeled_value_item(out, 'sum', key, val)
 
-    if file_total_funcs != 0:
-        summary = [("NCSS", all_in_one.average_nloc),
-                   ("CCN", all_in_one.average_cyclomatic_complexity)]
+    if files.functions != 0:
+        summary = [("NCSS", float(files.function_nloc) / files.functions),
+                   ("CCN", float(files.ccn) / files.functions)]
         for key, val in summary:
-            measure.appendChild(_create_labeled_value_item(
-                doc, 'average', key, val))
+            _write_labeled_value_item(out, 'average', key, val)
 
-    return measure
+    out.write('\t</measure>\n')
 
 
-def _create_label(doc, name):
-    label = doc.createElement("label")
-    text1 = doc.createTextNode(name)
-    label.appendChild(text1)
-    return label
+def _attribute(value):
+    return escape(value, {'"': '&quot;'})
 
 
-def _create_labels(doc, label_name):
-    labels = doc.createElement("labels")
+def _write_labels(out, label_name):
+    out.write('\t\t<labels>\n')
     for label in label_name:
-        labels.appendChild(_create_label(doc, label))
+        out.write('\t\t\t<label>%s</label>\n' % escape(label))
+    out.write('\t\t</labels>\n')
+
 
-    return labels
+def _item(name, values):
+    return '\t\t<item name="%s">\n%s\t\t</item>\n' % (
+        _attribute(name),
+        ''.join('\t\t\t<value>%s</value>\n' % escape(str(value))
+                for value in values))
 
 
-def _create_function_item(doc, number, file_name, func, verbose):
-    item = doc.createElement("item")
+def _write_function_item(out, number, file_name, func, verbose):
     if verbose:
-        item.setAttribute(
-            "name", "%s at %s:%s" %
-            (func.long_name, file_name, func.start_line))
+        name = "%s at %s:%s" % (func.long_name, file_name, func.start_line)
     else:
-        item.setAttribute(
-            "name", "%s(...) at %s:%s" %
-            (func.name, file_name, func.start_line))
-    value1 = doc.createElement("value")
-    text1 = doc.createTextNode(str(number))
-    value1.appendChild(text1)
-    item.appendChild(value1)
-    value2 = doc.createElement("value")
-    text2 = doc.createTextNode(str(func.nloc))
-    value2.appendChild(text2)
-    item.appendChild(value2)
-    value3 = doc.createElement("value")
-    text3 = doc.createTextNode(str(func.cyclomatic_complexity))
-    value3.appendChild(text3)
-    item.appendChild(value3)
-    return item
-
-
-def _create_labeled_value_item(doc, name, label, value):
-    average_ncss = doc.createElement(name)
-    average_ncss.setAttribute("label", label)
-    average_ncss.setAttribute("value", str(value))
-    return average_ncss
-
-
-def _create_file_node(doc, source_file, file_nr):
-    item = doc.createElement("item")
-    item.setAttribute("name", source_file.filename)
-    value1 = doc.createElement("value")
-    text1 = doc.createTextNode(str(file_nr))
-    value1.appendChild(text1)
-    item.appendChild(value1)
-    value2 = doc.createElement("value")
-    text2 = doc.createTextNode(str(source_file.nloc))
-    value2.appendChild(text2)
-    item.appendChild(value2)
-    value3 = doc.createElement("value")
-    text3 = doc.createTextNode(str(source_file.CCN))
-    value3.appendChild(text3)
-    item.appendChild(value3)
-    value4 = doc.createElement("value")
-    text4 = doc.createTextNode(str(len(source_file.function_list)))
-    value4.appendChild(text4)
-    item.appendChild(value4)
-    return item
+        name = "%s(...) at %s:%s" % (func.name, file_name, func.start_line)
+    out.write(_item(name, [number, func.nloc, func.cyclomatic_complexity]))
+
+
+def _write_labeled_value_item(out, name, label, value):
+    out.write('\t\t<%s label="%s" value="%s"/>\n' % (
+        name, _attribute(label), _attribute(str(value))))
+
+
+def _file_item(source_file, file_nr, ccn):
+    return _item(source_file.filename, [
+        file_nr, source_file.nloc, ccn, len(source_file.function_list)])
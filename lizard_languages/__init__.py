@@ -41,7 +41,35 @@ def languages():
     ]
 
 
+_EXTENSION_INDEX = {}
+_FALLBACK_READERS = []
+
+
+def register_reader(reader):
+    '''
+    Adds a language reader to the index used by get_reader_for.
+    When more than one reader claims the same file extension, the one
+    registered first wins. Extensions with a dot in them (e.g. "d.ts")
+    can't be looked up directly. They are matched one by one, before
+    the index, so that they win over the last part alone ("ts").
+    '''
+    for ext in reader.ext:
+        if '.' in ext:
+            if reader not in _FALLBACK_READERS:
+                _FALLBACK_READERS.append(reader)
+        else:
+            _EXTENSION_INDEX.setdefault(ext.lower(), reader)
+
+
 def get_reader_for(filename):
-    for lan in languages():
+    for lan in _FALLBACK_READERS:
         if lan.match_filename(filename):
             return lan
+    parts = filename.rsplit('.', 1)
+    if len(parts) == 2:
+        return _EXTENSION_INDEX.get(parts[1].lower())
+    return None
+
+
+for _reader in languages():
+    register_reader(_reader)
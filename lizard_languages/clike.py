@@ -46,8 +46,8 @@ class CLikeReader(CodeReader, CCppCommentsMixin):
                     elif macro.group(1) == 'include':
                         yield "#include"
                         yield macro.group(2) or "\"\""
-                    for _ in macro.group(2).splitlines()[1:]:
-                        yield '\n'
+                    self.context.current_line += len(
+                        macro.group(2).splitlines()[1:])
                 else:
                     yield token
 
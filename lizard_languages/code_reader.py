@@ -98,44 +98,64 @@ class CodeReader:
         self.context = context
         self.conditions = copy(self._conditions)
 
+    _filename_patterns = {}
+
     @classmethod
     def match_filename(cls, filename):
-        def compile_file_extension_re(*exts):
-            return re.compile(r".*\.(" + r"|".join(exts) + r")$", re.I)
-
-        return compile_file_extension_re(*cls.ext).match(filename)
+        exts = tuple(cls.ext)
+        if exts not in cls._filename_patterns:
+            cls._filename_patterns[exts] = re.compile(
+                r".*\.(" + r"|".join(re.escape(e) for e in exts) + r")$",
+                re.I)
+        return cls._filename_patterns[exts].match(filename)
+
+    # DO NOT put any sub groups in the regex. Good for performance
+    _until_end = r"(?:\\\n|[^\n])*"
+    combined_symbols = ["<<=", ">>=", "||", "&&", "===", "!==",
+                        "==", "!=", "<=", ">=", "->", "=>",
+                        "++", "--", '+=', '-=',
+                        "+", "-", '*', '/',
+                        '*=', '/=', '^=', '&=', '|=', "..."]
+    _token_patterns = {}
 
     @staticmethod
-    def generate_tokens(source_code, addition='', token_class=None):
-        def create_token(match):
-            return match.group(0)
-        if not token_class:
-            token_class = create_token
-
-        def _generate_tokens(source, add):
-            # DO NOT put any sub groups in the regex. Good for performance
-            _until_end = r"(?:\\\n|[^\n])*"
-            combined_symbols = ["<<=", ">>=", "||", "&&", "===", "!==",
-                                "==", "!=", "<=", ">=", "->", "=>",
-                                "++", "--", '+=', '-=',
-                                "+", "-", '*', '/',
-                                '*=', '/=', '^=', '&=', '|=', "..."]
-            token_pattern = re.compile(
+    def compile_token_pattern(addition='', flags=re.M | re.S):
+        '''
+        The token pattern with the language specific addition compiled.
+        Each pattern is compiled only once in a process and then shared
+        by all the files of the language.
+        '''
+        key = (addition, flags)
+        pattern = CodeReader._token_patterns.get(key)
+        if pattern is None:
+            pattern = CodeReader._token_patterns[key] = re.compile(
                 r"(?:" +
                 r"\/\*.*?\*\/" +
-                add +
+                addition +
                 r"|\w+" +
                 r"|\"(?:\\.|[^\"\\])*\"" +
                 r"|\'(?:\\.|[^\'\\])*?\'" +
-                r"|\/\/" + _until_end +
+                r"|\/\/" + CodeReader._until_end +
                 r"|\#" +
                 r"|:=|::|\*\*" +
                 r"|\<\s*\?(?:\s*extends\s+\w+)?\s*\>" +
-                r"|" + r"|".join(re.escape(s) for s in combined_symbols) +
+                r"|" + r"|".join(
+                    re.escape(s) for s in CodeReader.combined_symbols) +
                 r"|\\\n" +
                 r"|\n" +
                 r"|[^\S\n]+" +
-                r"|.)", re.M | re.S)
+                r"|.)", flags)
+        return pattern
+
+    @staticmethod
+    def generate_tokens(source_code, addition='', token_class=None):
+        def create_token(match):
+            return match.group(0)
+        if not token_class:
+            token_class = create_token
+
+        def _generate_tokens(source, add):
+            token_pattern = CodeReader.compile_token_pattern(add)
             macro = ""
             for match in token_pattern.finditer(source):
                 token = token_class(match)
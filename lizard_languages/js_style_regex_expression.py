@@ -5,19 +5,21 @@ generate token with javascript style regular expression.
 import re
 
 
+REGX_REGX = r"\/(\S*?[^\s\\]\/)+?(igm)*"
+REGX_PATTERN = re.compile(REGX_REGX)
+WORD_PATTERN = re.compile(r'\w+')
+
+
 def js_style_regex_expression(func):
     def generate_tokens_with_regex(source_code, _=""):
-        regx_regx = r"\/(\S*?[^\s\\]\/)+?(igm)*"
-        regx_pattern = re.compile(regx_regx)
-        word_pattern = re.compile(r'\w+')
-        tokens = func(source_code, r"|"+regx_regx)
+        tokens = func(source_code, r"|"+REGX_REGX)
         leading_by_word = False
         for token in tokens:
-            if leading_by_word and regx_pattern.match(token):
+            if leading_by_word and REGX_PATTERN.match(token):
                 for subtoken in func(token, _):
                     yield subtoken
             else:
                 yield token
             if not token.isspace():
-                leading_by_word = word_pattern.match(token)
+                leading_by_word = WORD_PATTERN.match(token)
     return generate_tokens_with_regex
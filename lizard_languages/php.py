@@ -15,16 +15,16 @@ class PHPReader(CodeReader, CCppCommentsMixin):
     language_names = ['php']
     _conditions = set(['if', 'elseif', 'for', 'while', '&&', '||', '?',
                        'catch', 'case'])
+    code_block_pattern = re.compile(
+        r"\<\?(?:php)?(.*?)(?:(\?\>)|\Z)",
+        re.M | re.S)
 
     @staticmethod
     def generate_tokens(source_code, addition='', token_class=None):
         addition += r"|(?:\$\w+)"
         addition += r"|(?:\<{3}(?P<quote>\w+).*?(?P=quote))"
         current_pos = 0
-        code_block_pattern = re.compile(
-                r"\<\?(?:php)?(.*?)(?:(\?\>)|\Z)",
-                re.M | re.S)
-        for match in code_block_pattern.finditer(source_code):
+        for match in PHPReader.code_block_pattern.finditer(source_code):
             if source_code[current_pos:match.start()]:
                 yield '"' + source_code[current_pos:match.start()] + '"'
             for token in CodeReader.generate_tokens(
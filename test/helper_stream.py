@@ -18,5 +18,8 @@ class StreamStdoutTestCase(unittest.TestCase):
         def write(self, x):
             self.stream += str(x)
 
+        def flush(self):
+            pass
+
         def __getattr__(self, attr):
             return getattr(self.stream, attr)
@@ -5,29 +5,28 @@ import os
 import sys
 
 
-@patch('lizard.md5_hash_file')
 @patch('lizard.auto_read', create=True)
-@patch.object(os, 'walk')
+@patch('lizard.walk_files')
 @patch.object(lizard, 'print_result')
 class TestApplication(unittest.TestCase):
 
-    def testEmptyResult(self, print_result, os_walk, mock_open, _):
+    def testEmptyResult(self, print_result, walk_files, mock_open):
 
         def check_empty_result(result, options, scheme, _):
             self.assertEqual([], list(result))
             return 0
 
-        os_walk.return_value = [('.', [], [])]
+        walk_files.return_value = []
         print_result.side_effect = check_empty_result
         lizard.main(['lizard'])
 
-    def testFilesWithFunction(self, print_result, os_walk, mock_open, _):
+    def testFilesWithFunction(self, print_result, walk_files, mock_open):
         def check_result(result, options, scheme, _):
             fileInfos = list(result)
             self.assertEqual(1, len(fileInfos))
             self.assertEqual('foo', fileInfos[0].function_list[0].name)
             return 0
-        os_walk.return_value = [('.', [], ['a.cpp'])]
+        walk_files.return_value = [os.path.join('.', 'a.cpp')]
         mock_open.return_value = "void foo(){}"
         print_result.side_effect = check_result
         lizard.main(['lizard'])
@@ -65,10 +64,9 @@ class IntegrationTests(unittest.TestCase):
         lizard.main(argv)
         return self.fileInfos
 
-    @patch('lizard.md5_hash_file')
-    @patch.object(os, 'walk')
-    def runApplicationWithArgv(self, argv, os_walk, _):
-        os_walk.return_value = [('.', [], ['a.cpp'])]
+    @patch('lizard.walk_files')
+    def runApplicationWithArgv(self, argv, walk_files):
+        walk_files.return_value = [os.path.join('.', 'a.cpp')]
         return self.run_with_mocks(argv, self.source_code)
 
     def test_with_preprocessor_counted_in_CCN(self):
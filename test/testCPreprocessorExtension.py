@@ -7,7 +7,7 @@ generate_tokens = CodeReader.generate_tokens
 
 
 def process_code(code, reader=None):
-    reader = reader or Mock(ext=["c"])
+    reader = reader or Mock(ext=["c"], context=Mock(current_line=1))
     tokens = generate_tokens(code)
     return [t for t in CPreprocessor()(tokens, reader)]
 
@@ -93,6 +93,12 @@ class TestCPreprocessor(unittest.TestCase):
         self.assertNotIn("2", tokens)
         self.assertIn("4", tokens)
 
+    def test_should_count_the_lines_it_removes(self):
+        reader = Mock(ext=["c"], context=Mock(current_line=1))
+        tokens = process_code("#if x\n#else\n2\n3\n#endif\n1", reader)
+        self.assertEqual(["\n", "\n", "1"], tokens)
+        self.assertEqual(4, reader.context.current_line)
+
 
 
 def analyze_with_extension(code):
@@ -2,8 +2,10 @@ import unittest
 from mock import Mock, patch
 from lizard import get_extensions, FileAnalyzer
 from lizard_ext.lizardio import LizardExtension as FanInOut
-from lizard import OutputScheme, FileInformation, FunctionInfo
+from lizard import OutputScheme, FileInformation, FunctionInfo, \
+    function_info_schema, function_info_class
 import importlib
+import pickle
 
 
 class FakeExtension:
@@ -40,6 +42,62 @@ class Test_using_extensions(unittest.TestCase):
         self.assertEqual(self.file_info.average_max_nesting_depth, 1.5)
 
 
+class Test_function_info_schema(unittest.TestCase):
+
+    class MyExt:
+        FUNCTION_INFO = {
+            "shown": {"caption": " shown ", "default": 0},
+            "no_default": {"caption": " none "},
+            "nloc": {"caption": " again ", "default": 5}}
+        FUNCTION_FIELDS = {"hidden": list}
+
+    def test_schema_has_the_fields_of_the_extensions(self):
+        self.assertEqual(
+            (("hidden", "no_default", "shown"),
+             (("hidden", list), ("shown", 0))),
+            function_info_schema([self.MyExt()]))
+
+    def test_no_extension_fields_is_the_plain_function_info(self):
+        self.assertIs(FunctionInfo,
+                      function_info_class(function_info_schema([])))
+
+    def test_the_class_is_made_once_per_schema(self):
+        schema = function_info_schema([self.MyExt()])
+        self.assertIs(function_info_class(schema),
+                      function_info_class(schema))
+
+    def test_fields_get_their_defaults(self):
+        cls = function_info_class(function_info_schema([self.MyExt()]))
+        func, other = cls("foo", "FILENAME"), cls("bar", "FILENAME")
+        self.assertEqual(0, func.shown)
+        self.assertEqual(1, func.nloc)
+        self.assertFalse(hasattr(func, "no_default"))
+        func.hidden.append("x")
+        self.assertEqual([], other.hidden)
+
+    def test_fields_are_slots(self):
+        cls = function_info_class(function_info_schema([self.MyExt()]))
+        func = cls("foo", "FILENAME")
+        func.shown = 3
+        func.undeclared = 4
+        self.assertEqual({"undeclared": 4}, vars(func))
+
+    def test_should_be_picklable(self):
+        cls = function_info_class(function_info_schema([self.MyExt()]))
+        func = cls("foo", "FILENAME", 3)
+        func.shown = 2
+        func.undeclared = 4
+        copy = pickle.loads(pickle.dumps(func))
+        self.assertIs(cls, type(copy))
+        self.assertEqual(func.__getstate__(), copy.__getstate__())
+
+    def test_analyzer_makes_functions_of_the_schema(self):
+        func = FileAnalyzer(get_extensions(["nd"])).analyze_source_code(
+            "a.cpp", "int foo(){}").function_list[0]
+        self.assertIn("max_nesting_depth", type(func).__slots__)
+        self.assertEqual({}, vars(func))
+
+
 class Test_using_multiple_base_extensions(unittest.TestCase):
     def setUp(self):
         self.ext = FanInOut()
@@ -1,7 +1,10 @@
 import unittest
 import platform
 from mock import patch
-from lizard import get_all_source_files
+from shutil import rmtree
+from tempfile import mkdtemp
+from lizard import get_all_source_files, load_source_files, FileDigest, \
+    compile_exclude_patterns, walk_files, _scan_dir
 import os
 
 
@@ -10,9 +13,9 @@ def which_system():
 
 
 class TestFilesFilter(unittest.TestCase):
-    @patch.object(os, "walk")
-    def test_no_matching(self, mock_os_walk):
-        mock_os_walk.return_value = []
+    @patch("lizard.walk_files")
+    def test_no_matching(self, mock_walk_files):
+        mock_walk_files.return_value = []
         files = get_all_source_files(["dir"], [], [])
         self.assertEqual(0, len(list(files)))
 
@@ -28,12 +31,10 @@ class TestFilesFilter(unittest.TestCase):
         files = get_all_source_files(["dir/file.log"], [], [])
         self.assertEqual(["dir/file.log"], list(files))
 
-    @patch('lizard.md5_hash_file')
-    @patch.object(os, "walk")
-    def test_exclude_file_name(self, mock_os_walk, md5):
-        mock_os_walk.return_value = (['.',
-                                      None,
-                                      ['temp.c', 'useful.cpp']],)
+    @patch("lizard.walk_files")
+    def test_exclude_file_name(self, mock_walk_files):
+        mock_walk_files.return_value = [
+            os.path.join('.', 'temp.c'), os.path.join('.', 'useful.cpp')]
         files = get_all_source_files(["dir"], ["*.c"], [])
         if which_system() == "Windows":
             file_names = [".\\useful.cpp"]
@@ -41,13 +42,11 @@ class TestFilesFilter(unittest.TestCase):
             file_names = ["./useful.cpp"]
         self.assertEqual(file_names, list(files))
 
-    @patch('lizard.md5_hash_file')
-    @patch.object(os, "walk")
-    def test_assigned_languages(self, mock_os_walk, md5):
-        mock_os_walk.return_value = (['.',
-                                      None,
-                                      ['temp.c', 'useful.cpp', 'x.java', 'x.js']],)
-        md5.side_effect = [1, 2, 3, 4, 5, 6, 7, 8, 9, 0]
+    @patch("lizard.walk_files")
+    def test_assigned_languages(self, mock_walk_files):
+        mock_walk_files.return_value = [
+            os.path.join('.', name)
+            for name in ['temp.c', 'useful.cpp', 'x.java', 'x.js']]
         files = list(get_all_source_files(["dir"], [], ['cpp', 'java']))
         if which_system() == "Windows":
             file_names = [".\\temp.c", ".\\useful.cpp", ".\\x.java", ".\\x.js"]
@@ -58,68 +57,146 @@ class TestFilesFilter(unittest.TestCase):
         self.assertIn(file_names[2], files)
         self.assertNotIn(file_names[3], files)
 
-    @patch.object(os, "walk")
-    def test_exclude_folder(self, mock_os_walk):
-        mock_os_walk.return_value = (['ut',
-                                      None,
-                                      ['useful.cpp']],)
+    @patch("lizard.walk_files")
+    def test_exclude_folder(self, mock_walk_files):
+        mock_walk_files.return_value = [os.path.join('ut', 'useful.cpp')]
         files = get_all_source_files(["dir"], ["ut/*"], [])
         self.assertEqual([], list(files))
 
-    @patch.object(os, "walk")
-    def test_exclude_folder_recursively(self, mock_os_walk):
-        mock_os_walk.return_value = (['ut/something',
-                                      None,
-                                      ['useful.cpp']],)
+    @patch("lizard.walk_files")
+    def test_exclude_folder_recursively(self, mock_walk_files):
+        mock_walk_files.return_value = [os.path.join('ut/something', 'useful.cpp')]
         files = get_all_source_files(["dir"], ["ut/*"], [])
         self.assertEqual([], list(files))
 
-    @patch.object(os, "walk")
-    def test_exclude_none_supported_files(self, mock_os_walk):
-        mock_os_walk.return_value = (['.',
-                                      None,
-                                      ['useful.txt']],)
+    @patch("lizard.walk_files")
+    def test_exclude_none_supported_files(self, mock_walk_files):
+        mock_walk_files.return_value = [os.path.join('.', 'useful.txt')]
         files = get_all_source_files(["dir"], ['exclude_me'], [])
         self.assertEqual([], list(files))
 
-    @patch.object(os, "walk")
-    @patch("lizard.auto_open", create=True)
-    def test_duplicates(self, mock_open, mock_os_walk):
-        mock_os_walk.return_value = (['.',
-                                      None,
-                                      ['f1.cpp', 'f2.cpp']],)
-        file_handle = mock_open.return_value.__enter__.return_value
-        file_handle.read.return_value = "int foo(){haha();\n}"
-        files = get_all_source_files(["dir"], [], [])
-        if which_system() == "Windows":
-            file_names = [".\\f1.cpp"]
-        else:
-            file_names = ["./f1.cpp"]
-        self.assertEqual(file_names, list(files))
 
-    @patch.object(os, "walk")
-    @patch("lizard.auto_open", create=True)
-    def test_nonduplicates(self, mock_open, mock_os_walk):
-        mock_os_walk.return_value = (['.',
-                                      None,
-                                      ['f1.cpp', 'f2.cpp']],)
-        file_handle = mock_open.return_value.__enter__.return_value
-        outs = ["int foo(){{haha({param});\n}}".format(param=i) for i in range(2)]
-        file_handle.read.side_effect = lambda: outs.pop()
-        files = get_all_source_files(["dir"], [], [])
-        if which_system() == "Windows":
-            file_names = [".\\f1.cpp", ".\\f2.cpp"]
-        else:
-            file_names = ["./f1.cpp", "./f2.cpp"]
-        self.assertEqual(file_names, list(files))
+class TestExcludePatterns(unittest.TestCase):
+
+    def test_file_patterns(self):
+        excluded, _ = compile_exclude_patterns(["*.c", "./ut/*"])
+        self.assertTrue(excluded("./a.c"))
+        self.assertTrue(excluded("./ut/a.cpp"))
+        self.assertFalse(excluded("./a.cpp"))
+
+    def test_no_patterns(self):
+        excluded, excluded_dir = compile_exclude_patterns([])
+        self.assertFalse(excluded("./a.c"))
+        self.assertFalse(excluded_dir("./ut"))
+
+    def test_folder_is_excluded_when_everything_in_it_is(self):
+        _, excluded_dir = compile_exclude_patterns(["./ut/*", "*.c"])
+        self.assertTrue(excluded_dir("./ut"))
+        self.assertTrue(excluded_dir("./ut/sub"))
+        self.assertFalse(excluded_dir("./src"))
+        self.assertFalse(excluded_dir("./src.c"))
+
+
+class TestWalkFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        for path in ["a.c", "src/b.c", "src/lib/c.c", "node_modules/d.js"]:
+            path = os.path.join(self.tmp_dir, *path.split("/"))
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, "w") as source:
+                source.write(path)
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def walk(self, *args):
+        return sorted(os.path.relpath(path, self.tmp_dir).replace(os.sep, "/")
+                      for path in walk_files(self.tmp_dir, *args))
+
+    def test_all_files(self):
+        self.assertEqual(
+            ["a.c", "node_modules/d.js", "src/b.c", "src/lib/c.c"],
+            self.walk())
+
+    def test_pruned_folder_should_not_be_walked(self):
+        self.assertEqual(
+            ["a.c", "src/b.c", "src/lib/c.c"],
+            self.walk(lambda path: path.endswith("node_modules")))
+
+    def test_multiple_threads(self):
+        self.assertEqual(self.walk(), self.walk(None, 3))
+
+    def test_excluded_folder_should_not_be_walked(self):
+        exclude = [os.path.join(self.tmp_dir, "node_modules", "*")]
+        with patch("lizard._scan_dir", side_effect=_scan_dir) as scan:
+            files = list(get_all_source_files([self.tmp_dir], exclude, []))
+        self.assertEqual(3, len(files))
+        self.assertEqual(3, scan.call_count)
+
+
+class TestDuplicateFilesFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def write(self, name, content):
+        with open(os.path.join(self.tmp_dir, name), "wb") as source:
+            source.write(content)
+
+    def source_files(self):
+        return sorted(
+            (os.path.basename(filename), code) for filename, code in
+            load_source_files([self.tmp_dir], [], []))
+
+    def test_duplicates(self):
+        self.write("f1.cpp", b"int foo(){haha();\n}")
+        self.write("f2.cpp", b"int foo(){haha();\n}")
+        self.assertEqual(1, len(self.source_files()))
+
+    def test_nonduplicates(self):
+        self.write("f1.cpp", b"int foo(){haha(0);\n}")
+        self.write("f2.cpp", b"int foo(){haha(1);\n}")
+        self.assertEqual(
+            ["f1.cpp", "f2.cpp"], [name for name, _ in self.source_files()])
+
+    def test_nonduplicates_with_the_same_beginning(self):
+        self.write("f1.cpp", b" " * 5000 + b"int foo(){haha(0);\n}")
+        self.write("f2.cpp", b" " * 5000 + b"int foo(){haha(1);\n}")
+        self.assertEqual(2, len(self.source_files()))
+
+    def test_file_with_unique_size_should_not_be_read(self):
+        self.write("f1.cpp", b"int foo(){}")
+        self.write("f2.cpp", b"int foobar(){}")
+        self.assertEqual(
+            [("f1.cpp", None), ("f2.cpp", None)], self.source_files())
+
+    def test_file_read_in_full_should_be_passed_on(self):
+        contents = {"f1.cpp": u"int foo(){haha(0);\n}",
+                    "f2.cpp": u"int foo(){haha(1);\n}"}
+        for name, content in contents.items():
+            self.write(name, content.encode('utf-8'))
+        read = [(name, code) for name, code in self.source_files() if code]
+        self.assertEqual(1, len(read))
+        self.assertEqual(contents[read[0][0]], read[0][1])
+
+    @unittest.skipIf(not hasattr(os, "link"), "no hardlink")
+    def test_hardlinks_should_be_found_without_reading(self):
+        self.write("f1.cpp", b"int foo(){}")
+        os.link(os.path.join(self.tmp_dir, "f1.cpp"),
+                os.path.join(self.tmp_dir, "f2.cpp"))
+        with patch.object(FileDigest, "head") as head:
+            self.assertEqual(1, len(self.source_files()))
+            self.assertFalse(head.called)
 
-    @patch.object(os, "walk")
-    @patch("lizard.auto_open", create=True)
-    def test_fail_to_open_file_should_be_allowed(self, mock_open, mock_os_walk):
-        mock_os_walk.return_value = (['.',
-                                      None,
-                                      ['f1.cpp', 'f2.cpp']],)
-        file_handle = mock_open.side_effect = IOError
+    @patch("lizard.walk_files")
+    def test_fail_to_open_file_should_be_allowed(self, mock_walk_files):
+        mock_walk_files.return_value = [
+            os.path.join('.', 'f1.cpp'), os.path.join('.', 'f2.cpp')]
         files = get_all_source_files(["dir"], [], [])
         if which_system() == "Windows":
             file_names = [".\\f1.cpp", ".\\f2.cpp"]
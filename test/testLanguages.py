@@ -1,5 +1,6 @@
 import unittest
-from lizard_languages import get_reader_for, CLikeReader, JavaReader, ObjCReader, JavaScriptReader, ScalaReader, GDScriptReader
+import lizard_languages
+from lizard_languages import get_reader_for, register_reader, CLikeReader, JavaReader, ObjCReader, JavaScriptReader, ScalaReader, GDScriptReader, TypeScriptReader
 
 
 class TestLanguageChooser(unittest.TestCase):
@@ -29,3 +30,41 @@ class TestLanguageChooser(unittest.TestCase):
 
     def test_unknown_extension(self):
         self.assertEqual(None, get_reader_for("a.unknown"))
+
+    def test_no_extension(self):
+        self.assertEqual(None, get_reader_for("Makefile"))
+
+
+class TestRegisterReader(unittest.TestCase):
+
+    def setUp(self):
+        self.index = dict(lizard_languages._EXTENSION_INDEX)
+        self.fallback = list(lizard_languages._FALLBACK_READERS)
+
+    def tearDown(self):
+        lizard_languages._EXTENSION_INDEX.clear()
+        lizard_languages._EXTENSION_INDEX.update(self.index)
+        lizard_languages._FALLBACK_READERS[:] = self.fallback
+
+    def test_register_reader(self):
+        class XyzReader(CLikeReader):
+            ext = ['xyz']
+        register_reader(XyzReader)
+        self.assertEqual(XyzReader, get_reader_for("a.XYZ"))
+
+    def test_register_reader_with_dotted_extension(self):
+        class DottedReader(CLikeReader):
+            ext = ['d.ts']
+        register_reader(DottedReader)
+        self.assertEqual(DottedReader, get_reader_for("a.d.ts"))
+        self.assertEqual(TypeScriptReader, get_reader_for("a.ts"))
+
+    def test_first_registered_reader_wins(self):
+        class AnotherCReader(CLikeReader):
+            ext = ['c']
+        register_reader(AnotherCReader)
+        self.assertEqual(CLikeReader, get_reader_for("a.c"))
+
+    def test_registered_readers_are_gone_after_the_test(self):
+        self.assertEqual(None, get_reader_for("a.xyz"))
+        self.assertEqual(TypeScriptReader, get_reader_for("a.d.ts"))
@@ -5,8 +5,8 @@ from test.helper_stream import StreamStdoutTestCase
 import os
 from lizard import print_warnings, print_and_save_modules, FunctionInfo, FileInformation,\
     print_result, print_extension_results, get_extensions, OutputScheme, get_warnings, print_clang_style_warning,\
-    parse_args, AllResult
-from lizard_ext import xml_output
+    parse_args, AllResult, print_streaming_result
+from lizard_ext import xml_output, print_xml
 
 def print_result_with_scheme(result, option):
     return print_result(result, option, OutputScheme(option.extensions), AllResult)
@@ -154,6 +154,55 @@ class TestAllOutput(StreamStdoutTestCase):
         self.check_whitelist('')
 
 
+class TestStreamingOutput(StreamStdoutTestCase):
+
+    def setUp(self):
+        StreamStdoutTestCase.setUp(self)
+        self.option = parse_args(["lizard", "-Ens"])
+        self.scheme = OutputScheme(self.option.extensions)
+        self.scheme.patch_for_extensions()
+
+    def file_infos(self):
+        foo = FunctionInfo("foo", 'f1.c', 100)
+        foo.cyclomatic_complexity = 16
+        foo.max_nested_structures = 2
+        bar = FunctionInfo("bar", 'f2.c', 10)
+        bar.max_nested_structures = 5
+        baz = FunctionInfo("baz", 'f2.c', 20)
+        baz.max_nested_structures = 0
+        return [FileInformation('f1.c', 10, [foo]), None,
+                FileInformation('f2.c', 20, [bar, baz]),
+                FileInformation('f3.c', 3, [])]
+
+    def output_of(self, printer):
+        sys.stdout.stream = ""
+        count = printer(iter(self.file_infos()), self.option, self.scheme,
+                        AllResult)
+        return count, sys.stdout.stream
+
+    def test_same_output_as_print_result(self):
+        self.assertEqual(self.output_of(print_result),
+                         self.output_of(print_streaming_result))
+
+    def test_same_output_when_sorted(self):
+        self.option.sorting = ["max_nested_structures"]
+        self.assertEqual(self.output_of(print_result),
+                         self.output_of(print_streaming_result))
+
+    def test_no_warnings(self):
+        self.option.thresholds = {}
+        self.assertEqual(self.output_of(print_result),
+                         self.output_of(print_streaming_result))
+
+    def test_nothing_to_print(self):
+        sys.stdout.stream = ""
+        print_streaming_result([], self.option, self.scheme, AllResult)
+        streamed = sys.stdout.stream
+        sys.stdout.stream = ""
+        print_result([], self.option, self.scheme, AllResult)
+        self.assertEqual(sys.stdout.stream, streamed)
+
+
 class TestXMLOutput(unittest.TestCase):
     foo = FunctionInfo("foo", '', 100)
     foo.cyclomatic_complexity = 16
@@ -171,3 +220,30 @@ class TestXMLOutput(unittest.TestCase):
         self.assertIn('''<sum label="NCSS" value="0"/>''', xml_empty)
         self.assertIn('''<sum label="CCN" value="0"/>''', xml_empty)
         self.assertIn('''<sum label="Functions" value="0"/>''', xml_empty)
+
+    def test_same_layout_as_minidom(self):
+        foo = FunctionInfo("foo", 'a&b.c', 100)
+        foo.cyclomatic_complexity = 16
+        foo.nloc = 5
+        foo.long_name = 'foo(vector<int> & v, "x")'
+        bar = FunctionInfo("bar", 'a&b.c', 7)
+        bar.nloc = 2
+        baz = FunctionInfo("baz", 'c.c', 1)
+        file_infos = [FileInformation('a&b.c', 10, [foo, bar]), None,
+                      FileInformation('empty.c', 3, []),
+                      FileInformation('c.c', 4, [baz])]
+        path = os.path.join(os.path.dirname(__file__), "data", "cppncss.xml")
+        with open(path) as expected:
+            self.assertEqual(expected.read(),
+                             xml_output(AllResult(file_infos), True))
+
+
+class TestPrintXML(StreamStdoutTestCase):
+
+    def test_files_are_written_as_they_come(self):
+        def results():
+            yield FileInformation('f1.c', 1, [FunctionInfo("foo", 'f1.c', 1)])
+            self.assertIn("foo at f1.c:1", sys.stdout.stream)
+            yield FileInformation('f2.c', 1, [])
+        print_xml(results(), Mock(verbose=True), None, AllResult)
+        self.assertIn('<item name="f2.c">', sys.stdout.stream)
@@ -1,6 +1,9 @@
 from mock import Mock, patch
 import unittest
 import sys
+import os
+from shutil import rmtree
+from tempfile import mkdtemp
 from lizard_ext import html_output
 from lizard import parse_args, FunctionInfo, FileInformation, AllResult
 from test.helper_stream import StreamStdoutTestCase
@@ -20,3 +23,57 @@ class TestHTMLOutput(StreamStdoutTestCase):
         self.assertRegexpMatches(sys.stdout.stream,
                                  r"\<html\>")
 
+
+    def test_should_have_each_function(self):
+        html_output([self.fileSummary], self.option, None, AllResult)
+        self.assertIn("Source file: <b>FILENAME</b>", sys.stdout.stream)
+        self.assertIn(">foo</td>", sys.stdout.stream)
+
+    def test_should_write_while_the_files_come(self):
+        def result():
+            yield self.fileSummary
+            self.assertIn(">foo</td>", sys.stdout.stream)
+        html_output(result(), self.option, None, AllResult)
+
+
+class TestHTMLPages(unittest.TestCase):
+
+    def setUp(self):
+        self.pages_dir = mkdtemp()
+        self.option = parse_args(["lizard", "--html-pages", self.pages_dir])
+        foo = FunctionInfo("foo", 'src/a.c', 100)
+        foo.cyclomatic_complexity = 20
+        self.file_infos = [
+            FileInformation("src/a.c", 10, [foo]),
+            FileInformation("lib/b.c", 10, [FunctionInfo("bar", 'lib/b.c')]),
+            FileInformation("src/c.c", 10, [FunctionInfo("baz", 'src/c.c')])]
+
+    def tearDown(self):
+        rmtree(self.pages_dir)
+
+    def page(self, name):
+        with open(os.path.join(self.pages_dir, name)) as page:
+            return page.read()
+
+    def test_html_pages_option_chooses_the_html_printer(self):
+        self.assertEqual(html_output, self.option.printer)
+
+    def test_one_page_for_each_directory(self):
+        html_output(self.file_infos, self.option, None, AllResult)
+        self.assertEqual(["index.html", "page1.html", "page2.html"],
+                         sorted(os.listdir(self.pages_dir)))
+        self.assertIn(">bar</td>", self.page("page1.html"))
+        self.assertNotIn(">foo</td>", self.page("page1.html"))
+        self.assertIn(">foo</td>", self.page("page2.html"))
+        self.assertIn(">baz</td>", self.page("page2.html"))
+
+    def test_index_links_to_the_pages(self):
+        html_output(self.file_infos, self.option, None, AllResult)
+        index = self.page("index.html")
+        self.assertIn('<a href="page1.html">lib</a>', index)
+        self.assertIn('<a href="page2.html">src</a>', index)
+        self.assertIn('<td class="warnings">1</td>', index)
+
+    def test_pages_link_back_to_the_index(self):
+        html_output(self.file_infos, self.option, None, AllResult)
+        self.assertIn('<a href="index.html">', self.page("page1.html"))
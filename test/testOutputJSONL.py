@@ -0,0 +1,61 @@
+import json
+import unittest
+import sys
+from lizard_ext import jsonl_output, print_jsonl
+from test.helper_stream import StreamStdoutTestCase
+from lizard import parse_args, FunctionInfo, FileInformation, AllResult
+
+
+class TestJSONLOutput(StreamStdoutTestCase):
+
+    def setUp(self):
+        StreamStdoutTestCase.setUp(self)
+        self.option = parse_args(["lizard", "--jsonl"])
+        self.foo = FunctionInfo("foo", 'FILENAME', 100)
+        self.foo.full_parameters = ["int a"]
+        self.fileSummary = FileInformation("FILENAME", 123, [self.foo])
+
+    def records(self):
+        return [json.loads(line) for line in sys.stdout.stream.splitlines()]
+
+    def test_jsonl_option_chooses_the_printer(self):
+        self.assertEqual(print_jsonl, self.option.printer)
+
+    def test_one_object_for_each_function(self):
+        jsonl_output([self.fileSummary, None], self.option)
+        record, = self.records()
+        self.assertEqual("function", record["type"])
+        self.assertEqual("foo", record["name"])
+        self.assertEqual("FILENAME", record["filename"])
+        self.assertEqual(100, record["start_line"])
+        self.assertEqual(1, record["parameter_count"])
+        self.assertEqual(["int a"], record["full_parameters"])
+
+    def test_fields_of_the_extensions(self):
+        option = parse_args(["lizard", "--jsonl", "-End", "-Eexitcount"])
+        self.foo.max_nesting_depth = 3
+        self.foo.exit_count = 2
+        jsonl_output([self.fileSummary], option)
+        record, = self.records()
+        self.assertEqual(3, record["max_nesting_depth"])
+        self.assertEqual(2, record["exit_count"])
+
+    def test_objects_for_files(self):
+        option = parse_args(["lizard", "--jsonl", "--jsonl-files", "-End"])
+        self.foo.nloc = 4
+        self.foo.max_nesting_depth = 3
+        jsonl_output([self.fileSummary], option)
+        function, source_file = self.records()
+        self.assertEqual("file", source_file["type"])
+        self.assertEqual(123, source_file["nloc"])
+        self.assertEqual(1, source_file["function_count"])
+        self.assertEqual(4, source_file["average_nloc"])
+        self.assertEqual(3, source_file["average_max_nesting_depth"])
+
+    def test_written_as_each_file_comes(self):
+        def result():
+            yield self.fileSummary
+            self.assertEqual(1, len(self.records()))
+            yield FileInformation("OTHER", 1, [FunctionInfo("bar", "OTHER")])
+        print_jsonl(result(), self.option, None, AllResult)
+        self.assertEqual(2, len(self.records()))
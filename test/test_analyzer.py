@@ -3,9 +3,15 @@
 #
 import unittest
 import sys
+import os
+import pickle
+import multiprocessing
 from mock import patch, Mock
 from lizard_languages import CLikeReader
-from lizard import map_files_to_analyzer, FunctionInfo, analyze_file, FileInfoBuilder
+from lizard import map_files_to_analyzer, FunctionInfo, analyze_file, FileInfoBuilder, \
+    FileAnalyzer, get_extensions, fuse_core_processors, fused_core_processor, \
+    core_counter, preprocessing, schedule_batches, WorkerStats, AnalysisPool, \
+    analyze_files, pack_fileinfos, unpack_fileinfo, _init_worker
 
 
 def analyzer_mock(filename):
@@ -139,3 +145,173 @@ class TestWarningFilterWithWhitelist(unittest.TestCase):
     def test_should_ignore_comments_in_whitelist(self):
         warnings = whitelist_filter(self.WARNINGS, 'foo  #,bar\ni#,bar')
         self.assertEqual(1, len(list(warnings)))
+
+
+class TestFusedCoreProcessors(unittest.TestCase):
+
+    SOURCES = {
+        "a.c": "/* a\n * b\n */\nint foo(int a) {\n  if (a && a > 1)\n"
+               "    return 1; // one\n#define X \\\n  2\n  return X;\n}\n",
+        "a.py": "def foo(a):\n    '''doc\n    '''\n    if a or a > 1:\n"
+                "        return 1  # one\n    return 0\n",
+        "a.js": "function foo(a) {\n  return a ? /x/g.test(a) : 0;\n}\n",
+        "a.rb": "def foo(a)\n  return 1 if a\n  0\nend\n",
+        "g.c": "int foo(){}\n// GENERATED CODE\nint bar(){if(a);}\n",
+        "f.c": "// #lizard forgive\nint foo(){if(a);}\nint bar(){}\n",
+    }
+
+    def analyze(self, filename, extensions, fused):
+        analyzer = FileAnalyzer(get_extensions(extensions), fused=fused)
+        return pickle.dumps(
+            analyzer.analyze_source_code(filename, self.SOURCES[filename]))
+
+    def assert_same_result(self, extensions=()):
+        for filename in self.SOURCES:
+            self.assertEqual(
+                self.analyze(filename, list(extensions), False),
+                self.analyze(filename, list(extensions), True), filename)
+
+    def test_should_give_the_same_result(self):
+        self.assert_same_result()
+
+    def test_should_give_the_same_result_with_extensions(self):
+        self.assert_same_result(["nd", "nonstrict", "io"])
+
+    def test_should_fuse_only_the_builtin_processors(self):
+        extension = Mock(spec=[])
+        processors = fuse_core_processors(get_extensions([extension]))
+        self.assertEqual([fused_core_processor, extension], processors)
+
+    def test_extension_between_should_keep_preprocessing(self):
+        extension = Mock(spec=["ordering_index"], ordering_index=1)
+        processors = fuse_core_processors(get_extensions([extension]))
+        self.assertEqual([preprocessing, extension, core_counter], processors)
+
+
+class TestScheduleBatches(unittest.TestCase):
+
+    def test_largest_files_go_first(self):
+        sources = [("small.c", "x"), ("big.c", "x" * 100000), ("mid.c", "x" * 5000)]
+        batches = schedule_batches(sources, 2)
+        self.assertEqual(("big.c", "x" * 100000), batches[0][0])
+
+    def test_big_file_gets_its_own_batch(self):
+        sources = [("f%d.c" % i, "x") for i in range(100)] + [("big.c", "x" * 1000000)]
+        batches = schedule_batches(sources, 4)
+        self.assertEqual([("big.c", "x" * 1000000)], batches[0])
+
+    def test_small_files_are_batched(self):
+        sources = [("f%d.c" % i, "x") for i in range(1000)]
+        batches = schedule_batches(sources, 4)
+        self.assertTrue(1 < len(batches) <= 4 * 8 + 1)
+        self.assertEqual(sorted(sources), sorted(sum(batches, [])))
+
+    def test_no_files(self):
+        self.assertEqual([], schedule_batches([], 4))
+
+    @patch.object(os.path, "getsize")
+    def test_size_of_unread_files_comes_from_the_file_system(self, getsize):
+        getsize.side_effect = lambda name: {"a.c": 10, "b.c": 100000}[name]
+        self.assertEqual(["b.c"], schedule_batches(["a.c", "b.c"], 1)[0][:1])
+
+
+class TestWorkerStats(unittest.TestCase):
+
+    def test_results_are_unbatched_and_counted(self):
+        stats = WorkerStats()
+        r = map_files_to_analyzer(["f1", "f2", "f3"], analyzer_mock, 2, stats)
+        self.assertEqual(["f1", "f2", "f3"], sorted(r))
+        self.assertEqual(3, sum(stats.files.values()))
+
+    def test_clock_starts_with_the_first_batch(self):
+        stats = WorkerStats()
+        with patch("lizard.schedule_batches", side_effect=lambda files, n: (
+                self.assertIsNone(stats.start), [[f] for f in files])[1]):
+            list(map_files_to_analyzer(["f1"], analyzer_mock, 2, stats))
+        self.assertIsNotNone(stats.start)
+
+    def test_report(self):
+        stats = WorkerStats()
+        stats.started()
+        stats.add(123, 0.5, 3)
+        stream = Mock()
+        stats.report(stream)
+        self.assertIn("worker 1: 3 files", stream.write.call_args[0][0])
+
+
+class TestAnalysisPool(unittest.TestCase):
+
+    def test_pool_is_reused(self):
+        with AnalysisPool(2) as pool:
+            first = map_files_to_analyzer(["f1"], analyzer_mock, 1, pool=pool)
+            second = map_files_to_analyzer(["f2"], analyzer_mock, 1, pool=pool)
+            self.assertEqual(["f1", "f2"], list(first) + list(second))
+            workers = multiprocessing.active_children()
+            self.assertEqual(2, len(workers))
+        self.assertEqual([], multiprocessing.active_children())
+
+    def test_pool_is_passed_to_analyze_files(self):
+        with AnalysisPool(2) as pool:
+            result = analyze_files(
+                [("a.c", "int foo(){}"), ("b.c", "int bar(){}")], pool=pool)
+            self.assertEqual(
+                ["a.c", "b.c"], sorted(f.filename for f in result))
+
+    def test_pool_for_threads_is_closed_at_the_end(self):
+        r = map_files_to_analyzer(["f1", "f2"], analyzer_mock, 2)
+        self.assertEqual(["f1", "f2"], sorted(r))
+        self.assertEqual([], multiprocessing.active_children())
+
+    def test_workers_are_recycled(self):
+        with AnalysisPool(1, maxtasksperchild=1) as pool:
+            workers = set(pool.imap_unordered(worker_pid, range(3)))
+        self.assertEqual(3, len(workers))
+
+
+def worker_pid(_):
+    return os.getpid()
+
+
+class TestPackedFileInformation(unittest.TestCase):
+
+    CODE = "int foo(int a, int b){if(a) bar(a);}\nvoid bar(int a){foo(a, a);}\n"
+
+    def test_unpacked_result_is_the_same(self):
+        fileinfo = FileAnalyzer(get_extensions(["io", "nd"])).analyze_source_code(
+            "a.c", self.CODE)
+        packed = pickle.loads(pickle.dumps(pack_fileinfos([fileinfo])))
+        unpacked = unpack_fileinfo(packed[0])
+        self.assertEqual(
+            list(fileinfo.__getstate__()), list(unpacked.__getstate__()))
+        self.assertEqual(fileinfo.nloc, unpacked.nloc)
+        self.assertEqual(
+            [f.__getstate__() for f in fileinfo.function_list],
+            [f.__getstate__() for f in unpacked.function_list])
+        self.assertEqual(
+            [type(f) for f in fileinfo.function_list],
+            [type(f) for f in unpacked.function_list])
+
+    def test_equal_strings_are_sent_once(self):
+        fileinfo = FileAnalyzer(get_extensions(["io"])).analyze_source_code(
+            "a.c", self.CODE * 50)
+        self.assertLess(
+            len(pickle.dumps(pack_fileinfos([fileinfo]))),
+            len(pickle.dumps([fileinfo])) * 0.6)
+
+    def test_results_from_the_pool_are_unpacked(self):
+        with AnalysisPool(2) as pool:
+            result = list(analyze_files([("a.c", self.CODE)], pool=pool))
+        self.assertEqual(["foo", "bar"], [f.name for f in result[0].function_list])
+
+    def test_other_results_are_passed_as_they_are(self):
+        self.assertEqual(["f1"], pack_fileinfos(["f1"]))
+        self.assertEqual("f1", unpack_fileinfo("f1"))
+
+
+class TestInitWorker(unittest.TestCase):
+
+    def test_token_patterns_are_compiled(self):
+        from lizard_languages.code_reader import CodeReader
+        with patch.dict(CodeReader._token_patterns, clear=True):
+            _init_worker()
+            self.assertTrue(len(CodeReader._token_patterns) > 5)
@@ -5,6 +5,7 @@ import io
 import os
 from tempfile import NamedTemporaryFile
 from lizard_ext import auto_open, auto_read
+from lizard_ext.auto_open import decode_source
 
 
 class TestAutoOpen(unittest.TestCase):
@@ -44,3 +45,39 @@ class TestAutoRead(unittest.TestCase):
     def test_at(self):
         result = auto_read(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data/utf.c'))
         self.assertIn("after", result)
+
+
+class TestDecodeSource(unittest.TestCase):
+
+    def test_utf_8_with_bom(self):
+        binary = codecs.BOM_UTF8 + u"天下太平".encode('utf-8')
+        self.assertEqual(u"天下太平", decode_source(binary))
+
+    def test_universal_newlines(self):
+        self.assertEqual("a\nb\n", decode_source(b"a\r\nb\r"))
+
+    def test_invalid_utf_8(self):
+        self.assertIn("after", decode_source(b"before \xff after"))
+
+
+class TestAutoOpenOtherModes(unittest.TestCase):
+
+    def setUp(self):
+        with NamedTemporaryFile() as f:
+            self.filename = f.name
+
+    def tearDown(self):
+        if os.path.exists(self.filename):
+            os.unlink(self.filename)
+
+    def test_write(self):
+        with auto_open(self.filename, 'w', encoding='utf-8') as handle:
+            handle.write(u"abc")
+        with io.open(self.filename) as handle:
+            self.assertEqual("abc", handle.read())
+
+    def test_other_arguments_are_passed_on(self):
+        with io.open(self.filename, 'wb') as handle:
+            handle.write(codecs.BOM_UTF8 + b"a\r\nb")
+        with auto_open(self.filename, 'r', newline='', buffering=1) as handle:
+            self.assertEqual(u"a\r\nb", handle.read())
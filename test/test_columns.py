@@ -0,0 +1,61 @@
+import unittest
+from mock import patch
+from lizard import FunctionInfo, FileInformation, AllResult
+from lizard_ext import columns
+from lizard_ext.columns import FunctionColumns
+
+
+def function(name, nloc, ccn):
+    fun = FunctionInfo(name, "a.c", ccn=ccn)
+    fun.nloc = nloc
+    return fun
+
+
+class TestFunctionColumns(unittest.TestCase):
+
+    def setUp(self):
+        self.functions = [
+            function("a", 10, 1), function("b", 3, 20), function("c", 40, 30)]
+        self.columns = FunctionColumns(self.functions)
+
+    def test_total(self):
+        self.assertEqual(53, self.columns.total("nloc"))
+
+    def test_average(self):
+        self.assertEqual(17.0, self.columns.average("cyclomatic_complexity"))
+
+    def test_average_of_no_function(self):
+        self.assertEqual(0, FunctionColumns([]).average("nloc"))
+
+    def test_exceeding_any_threshold_in_order(self):
+        self.assertEqual(
+            ["b", "c"],
+            [f.name for f in self.columns.exceeding(
+                {"nloc": 30, "cyclomatic_complexity": 15})])
+
+    def test_equal_to_threshold_is_not_exceeding(self):
+        self.assertEqual([], self.columns.exceeding({"nloc": 40}))
+
+    def test_exceeding_with_no_function(self):
+        self.assertEqual([], FunctionColumns([]).exceeding({"nloc": 1}))
+
+    def test_column_is_read_once(self):
+        self.columns.column("nloc")
+        self.functions[0].nloc = 100
+        self.assertEqual(53, self.columns.total("nloc"))
+
+
+@patch.object(columns, "numpy", None)
+class TestFunctionColumnsWithoutNumPy(TestFunctionColumns):
+    pass
+
+
+class TestAllResultWithColumns(unittest.TestCase):
+
+    def test_averages_of_all_functions(self):
+        all_result = AllResult([
+            FileInformation("a.c", 20, [function("a", 10, 1)]),
+            FileInformation("b.c", 10, [function("b", 4, 4)])])
+        self.assertEqual(30, all_result.as_fileinfo().nloc)
+        self.assertEqual(7.0, all_result.as_fileinfo().average_nloc)
+        self.assertEqual(14, all_result.nloc_in_functions())
@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+from lizard import AnalysisPool
+from lizard_ext.clone_index import SpooledArray, ExternalSort, clone_groups
+from lizard_ext.clone_store import save_clone_index, StoredCloneIndex
+
+
+class TestSpooledArray(unittest.TestCase):
+
+    def test_stays_in_memory_under_max_size(self):
+        values = SpooledArray('i', 100)
+        values.extend([1, 2, 3])
+        self.assertIsNone(values.file)
+        self.assertEqual([1, 2, 3], list(values.view()))
+
+    def test_moves_to_file_over_max_size(self):
+        values = SpooledArray('i', 8)
+        values.extend([1, 2])
+        values.extend([3])
+        values.extend([4, 5])
+        self.assertIsNotNone(values.file)
+        self.assertEqual(5, len(values))
+        self.assertEqual([1, 2, 3, 4, 5], list(values.view()))
+        self.assertEqual(4, values.view()[3])
+
+
+class TestExternalSort(unittest.TestCase):
+
+    def sort(self, items, max_size):
+        sorter = ExternalSort(max_size)
+        sorter.CHUNK = 3
+        sorter.max_items = max_size and 3
+        for item in items:
+            sorter.add(item)
+        return list(sorter), len(sorter.runs)
+
+    def test_in_memory(self):
+        self.assertEqual(([1, 2, 3], 0), self.sort([3, 1, 2], None))
+
+    def test_merges_the_runs(self):
+        items = [(7 << 70) + 5, 1, 9, 1 << 64, 4, 3, 8]
+        self.assertEqual((sorted(items), 3), self.sort(items, 1))
+
+
+class TestCloneGroups(unittest.TestCase):
+
+    def groups(self, hashes, max_size=None, pool=None):
+        return list(clone_groups(
+            hashes, set([0, len(hashes)]), 0, max_size, pool))
+
+    def test_groups_in_order_of_first_position(self):
+        self.assertEqual(
+            [[0, 3], [1], [2, 4]], self.groups([9, 1, 5, 9, 5]))
+
+    def test_same_groups_when_spilled(self):
+        hashes = [(i * 7919) % 1013 for i in range(10000)]
+        self.assertEqual(self.groups(hashes), self.groups(hashes, 1))
+
+    def test_same_groups_from_shards(self):
+        hashes = [(i * 7919) % 1013 for i in range(10000)]
+        with AnalysisPool(3) as pool:
+            self.assertEqual(self.groups(hashes), self.groups(hashes, 1, pool))
+        self.assertEqual([], multiprocessing.active_children())
+
+    def test_repeats_in_the_same_file_are_left_out_in_shards(self):
+        hashes = [1, 2, 1, 1, 2]
+        boundaries = set([0, 3, 5])
+        expected = list(clone_groups(hashes, boundaries, 2))
+        with AnalysisPool(2) as pool:
+            self.assertEqual(expected, list(
+                clone_groups(hashes, boundaries, 2, None, pool)))
+        self.assertEqual([[0, 3], [1, 4]], expected)
+
+
+class TestStoredCloneIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "clone_index")
+        save_clone_index(
+            self.path, "sig", [(0, "a.c"), (3, "b.c")], [9, 1, 5, 5, 9],
+            ([1, 2, 3, 1, 2], [4, 5, 6, 4, 5]), 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_reads_back_the_files_and_windows(self):
+        index = StoredCloneIndex(self.path, "sig")
+        self.assertEqual(["a.c", "b.c"], index.filenames)
+        self.assertEqual([0, 3], index.offsets)
+        self.assertEqual([3, 2], index.counts)
+        self.assertEqual(0, index.file_of(2))
+        self.assertEqual(1, index.file_of(3))
+        self.assertEqual(
+            ([1, 5, 5], [2, 3, 1], [5, 6, 4]),
+            tuple(list(values) for values in index.windows(1, 4)))
+
+    def test_finds_the_windows_with_the_hashes(self):
+        index = StoredCloneIndex(self.path, "sig")
+        self.assertEqual([0, 2, 3, 4], index.windows_with([5, 9, 7]))
+
+    def test_another_signature_is_not_used(self):
+        self.assertRaises(ValueError, StoredCloneIndex, self.path, "other")
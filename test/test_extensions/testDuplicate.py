@@ -1,3 +1,6 @@
+import os
+import shutil
+import tempfile
 import unittest
 from mock import patch
 from ..testHelpers import get_cpp_fileinfo_with_extension
@@ -293,6 +296,64 @@ class TestDuplicateExtensionAcrossFiles(unittest.TestCase):
         self.assertEqual(1, len(duplicates))
 
 
+class TestDuplicateExtensionWithCloneIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.builder = CFunctionBuilder()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    @patch('lizard.auto_read', create=True)
+    def detect(self, source_files, changes_only, auto_read):
+        auto_read.side_effect = lambda filename: source_files[filename]
+        self.detector = detector = DuplicateDetector()
+        detector.index_path = self.path("clone_index")
+        detector.signature = "test"
+        detector.changes_only = changes_only
+        for filename in source_files:
+            open(filename, "w").close()
+        list(analyze_files(sorted(source_files), exts=get_extensions(
+            [detector])))
+        return list(detector.get_duplicates(30))
+
+    def test_finds_duplicates_of_the_changed_files_in_the_saved_index(self):
+        self.detect({
+            self.path('f1.cpp'): self.builder.six_line_function().build(),
+            self.path('f2.cpp'): CFunctionBuilder().five_line_function()
+                                 .six_line_function().build()}, False)
+        duplicates = self.detect({
+            self.path('f3.cpp'): self.builder.six_line_function().build()},
+            True)
+        self.assertEqual([
+            [self.path('f3.cpp'), self.path('f1.cpp')],
+            [self.path('f3.cpp'), self.path('f1.cpp'), self.path('f2.cpp')]],
+            [[snippet.file_name for snippet in duplicate]
+             for duplicate in duplicates])
+        self.assertEqual(6, duplicates[1][2].start_line)
+        self.assertEqual(1, self.detector.duplicate_rate())
+
+    def test_leaves_out_the_duplicates_only_in_the_saved_index(self):
+        self.detect({
+            self.path('f1.cpp'): self.builder.six_line_function().build(),
+            self.path('f2.cpp'): self.builder.build()}, False)
+        duplicates = self.detect({
+            self.path('f3.cpp'): CFunctionBuilder().empty_function()
+                                 .build()}, True)
+        self.assertEqual([], duplicates)
+
+    def test_checks_only_the_changed_files_without_an_index(self):
+        duplicates = self.detect({
+            self.path('f3.cpp'): self.builder.six_line_function().build()},
+            True)
+        self.assertEqual([], duplicates)
+        self.assertFalse(os.path.exists(self.path("clone_index")))
+
+
 class CFunctionBuilder(object):
     def __init__(self):
         self.code = ''
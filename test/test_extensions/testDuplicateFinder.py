@@ -1,5 +1,5 @@
 import unittest
-from lizard_ext.lizardduplicate import DuplicateFinder
+from lizard_ext.lizardduplicate import DuplicateFinder, ContainingIntervals
 
 
 class Node(object):
@@ -11,7 +11,8 @@ class TestDuplicateFinder(unittest.TestCase):
 
     def find_in(self, nodes):
         nodes = list(Node("%s@%s"%(v, i), v) for i,v in enumerate(nodes + [-1]))
-        finder = DuplicateFinder(nodes, [0], collapse_repeat_tokens=0)
+        finder = DuplicateFinder(
+            [n.hash for n in nodes], [0], collapse_repeat_tokens=0)
         dups = finder.find_start_and_ends()
         dups = list(
                 [(nodes[start], nodes[end]) for start, end in v]
@@ -56,3 +57,24 @@ class TestDuplicateFinder(unittest.TestCase):
 
 
 
+
+
+class TestContainingIntervals(unittest.TestCase):
+
+    def test_contains_the_intervals_inside_one_added(self):
+        intervals = ContainingIntervals()
+        intervals.add(3, 8)
+        intervals.add(10, 12)
+        self.assertTrue(intervals.contains(3, 8))
+        self.assertTrue(intervals.contains(4, 6))
+        self.assertTrue(intervals.contains(10, 11))
+        self.assertFalse(intervals.contains(2, 6))
+        self.assertFalse(intervals.contains(7, 10))
+        self.assertFalse(intervals.contains(13, 13))
+
+    def test_an_interval_around_others_replaces_them(self):
+        intervals = ContainingIntervals()
+        for start, end in [(5, 6), (2, 3), (8, 9), (4, 4), (1, 7)]:
+            intervals.add(start, end)
+        self.assertEqual(([1, 8], [7, 9]), (intervals.starts, intervals.ends))
+        self.assertTrue(intervals.contains(5, 7))
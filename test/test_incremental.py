@@ -0,0 +1,94 @@
+import unittest
+import os
+from shutil import rmtree
+from tempfile import mkdtemp
+from mock import patch
+from lizard import FileInformation, get_all_source_files, preprocessing
+from lizard_ext.incremental import changed_files, files_under, \
+    merge_with_baseline, load_baseline
+
+
+class TestChangedFiles(unittest.TestCase):
+
+    @patch('subprocess.check_output')
+    def test_changed_and_deleted_files(self, check_output):
+        outputs = {
+            "--diff-filter=d": b"a.c\nb/c.cpp\n",
+            "--others": b"new.py\n",
+            "--diff-filter=D": b"old.c\n"}
+        check_output.side_effect = lambda args: next(
+            out for key, out in outputs.items() if key in args)
+        changed, deleted = changed_files("HEAD~1")
+        self.assertEqual(["a.c", "b/c.cpp", "new.py"], changed)
+        self.assertEqual(["old.c"], deleted)
+        self.assertIn("HEAD~1", check_output.call_args_list[0][0][0])
+
+    def test_files_under_the_paths(self):
+        files = ["a.c", os.path.join("src", "b.c"), "srcx.c"]
+        self.assertEqual(files, list(files_under(["."], files)))
+        self.assertEqual([os.path.join("src", "b.c")],
+                         list(files_under(["src"], files)))
+
+    def test_files_under_absolute_paths(self):
+        files = ["a.c", os.path.join("src", "b.c")]
+        self.assertEqual(
+            [os.path.join("src", "b.c")],
+            list(files_under([os.path.abspath("src")], files)))
+
+    @patch.object(os.path, "isfile")
+    def test_listed_files_should_be_filtered(self, mock_isfile):
+        mock_isfile.return_value = False
+        files = get_all_source_files(
+            ["."], ["*.cpp"], [], ["a.c", "b.txt", "c.cpp"])
+        self.assertEqual(["a.c"], list(files))
+
+
+class TestMergeWithBaseline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.baseline = os.path.join(self.tmp_dir, "baseline")
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def merge(self, names, replaced=None, extensions=()):
+        result = [FileInformation(name, 1) for name in names]
+        baseline = load_baseline(self.baseline, extensions)
+        return [f.filename for f in merge_with_baseline(
+            result, self.baseline, extensions, baseline, replaced)]
+
+    def test_should_save_the_result_as_baseline(self):
+        self.assertEqual(["a.c", "b.c"], self.merge(["a.c", "b.c"]))
+        self.assertEqual(
+            ["a.c", "b.c"],
+            [f.filename for f in load_baseline(self.baseline, ())])
+
+    def test_should_keep_the_unchanged_files(self):
+        self.merge(["./a.c", "./b.c"])
+        self.assertEqual(["b.c", "./a.c"], self.merge(["b.c"], ["b.c"]))
+
+    def test_should_drop_the_deleted_files(self):
+        self.merge(["a.c", "b.c"])
+        self.assertEqual(["b.c"], self.merge(["b.c"], ["a.c", "b.c"]))
+        self.assertEqual(["b.c"], self.merge([], []))
+
+    def test_should_replace_the_whole_baseline_without_replaced(self):
+        self.merge(["a.c", "b.c"])
+        self.assertEqual(["c.c"], self.merge(["c.c"]))
+
+    def test_changed_file_with_absolute_path_should_be_replaced(self):
+        absolute = os.path.abspath("b.c")
+        self.merge(["a.c", absolute])
+        self.assertEqual(
+            [absolute, "a.c"], self.merge([absolute], ["b.c"]))
+
+    def test_baseline_of_other_extensions_should_not_be_used(self):
+        self.merge(["a.c"])
+        self.assertIsNone(load_baseline(self.baseline, [preprocessing]))
+
+    def test_broken_baseline_should_not_be_used(self):
+        with open(self.baseline, "wb") as baseline:
+            baseline.write(b"broken")
+        self.assertIsNone(load_baseline(self.baseline, ()))
+        self.assertIsNone(load_baseline(self.baseline + "x", ()))
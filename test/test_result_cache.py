@@ -0,0 +1,77 @@
+import unittest
+import os
+from shutil import rmtree
+from tempfile import mkdtemp
+from mock import Mock
+from lizard import analyze_file, get_extensions, FileAnalyzer
+from lizard_ext import ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = mkdtemp()
+        self.cache = ResultCache(self.cache_dir, get_extensions([]))
+
+    def tearDown(self):
+        rmtree(self.cache_dir)
+
+    def fetch(self, filename, code, cache=None):
+        analyze = Mock(side_effect=analyze_file.analyze_source_code)
+        fileinfo = (cache or self.cache).fetch(filename, code, analyze)
+        return fileinfo, analyze.call_count
+
+    def test_should_analyze_when_not_cached(self):
+        fileinfo, count = self.fetch("a.c", "int foo(){}")
+        self.assertEqual(1, count)
+        self.assertEqual("foo", fileinfo.function_list[0].name)
+
+    def test_should_not_analyze_again_when_cached(self):
+        self.fetch("a.c", "int foo(){}")
+        fileinfo, count = self.fetch("a.c", "int foo(){}")
+        self.assertEqual(0, count)
+        self.assertEqual("foo", fileinfo.function_list[0].name)
+
+    def test_should_analyze_again_when_the_code_changed(self):
+        self.fetch("a.c", "int foo(){}")
+        _, count = self.fetch("a.c", "int bar(){}")
+        self.assertEqual(1, count)
+
+    def test_should_reuse_the_result_of_the_same_content(self):
+        self.fetch("a.c", "int foo(){}")
+        fileinfo, count = self.fetch("b.c", "int foo(){}")
+        self.assertEqual(0, count)
+        self.assertEqual("b.c", fileinfo.filename)
+        self.assertEqual("b.c", fileinfo.function_list[0].filename)
+
+    def test_should_not_reuse_the_result_of_another_language(self):
+        self.fetch("a.c", "int foo(){}")
+        _, count = self.fetch("a.java", "int foo(){}")
+        self.assertEqual(1, count)
+
+    def test_should_not_reuse_the_result_of_other_extensions(self):
+        self.fetch("a.c", "int foo(){}")
+        cache = ResultCache(self.cache_dir, get_extensions(["nd"]))
+        _, count = self.fetch("a.c", "int foo(){}", cache)
+        self.assertEqual(1, count)
+
+    def test_prune_should_remove_least_recently_used_entries(self):
+        self.fetch("a.c", "int foo(){}")
+        self.fetch("b.c", "int bar(){}")
+        entries = sorted(path for _, _, path in self.cache.entries())
+        os.utime(entries[0], (1, 1))
+        self.cache.max_size = os.path.getsize(entries[1])
+        self.cache.prune()
+        self.assertEqual(
+            [entries[1]], [path for _, _, path in self.cache.entries()])
+
+    def test_file_analyzer_should_use_the_cache(self):
+        analyzer = FileAnalyzer(get_extensions([]), self.cache)
+        analyzer.analyze_source_code = Mock()
+        path = os.path.join(self.cache_dir, "a.c")
+        with open(path, "w") as source:
+            source.write("int foo(){}")
+        self.fetch(path, "int foo(){}")
+        fileinfo = analyzer(path)
+        self.assertFalse(analyzer.analyze_source_code.called)
+        self.assertEqual("foo", fileinfo.function_list[0].name)
@@ -0,0 +1,123 @@
+import os
+import sys
+import unittest
+from shutil import rmtree
+from tempfile import mkdtemp
+from lizard import FileAnalyzer, get_extensions, FileInformation, \
+    FunctionInfo, main
+from lizard_ext import ResultFile, save_result
+from lizard_ext.result_file import ResultFileWriter
+from test.helper_stream import StreamStdoutTestCase
+
+CODE = '''
+int foo(int a, char* b) { if (a) { while (b) {} } return 1; }
+void bar() {}
+'''
+
+
+class TestResultFile(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = mkdtemp()
+        self.path = os.path.join(self.dir, "result.lzr")
+        self.extensions = get_extensions(["nd"])
+        analyzer = FileAnalyzer(self.extensions)
+        self.fileinfos = [
+            analyzer.analyze_source_code("src/a.c", CODE),
+            FileInformation(u"src/émpty.c", 3),
+            analyzer.analyze_source_code("src/b.c", CODE + CODE)]
+
+    def tearDown(self):
+        rmtree(self.dir)
+
+    def save(self, fileinfos=None, extensions=None):
+        list(save_result(
+            self.fileinfos if fileinfos is None else fileinfos, self.path,
+            self.extensions if extensions is None else extensions))
+        return ResultFile(self.path)
+
+    def assertSameFile(self, expected, actual):
+        self.assertEqual(
+            (expected.filename, expected.nloc, expected.token_count),
+            (actual.filename, actual.nloc, actual.token_count))
+        self.assertEqual(len(expected.function_list),
+                         len(actual.function_list))
+        for fun, loaded in zip(expected.function_list, actual.function_list):
+            for name in ("name", "long_name", "filename", "start_line",
+                         "end_line", "nloc", "cyclomatic_complexity",
+                         "token_count", "length", "full_parameters",
+                         "max_nesting_depth"):
+                self.assertEqual(getattr(fun, name), getattr(loaded, name))
+
+    def test_saved_result_is_passed_through(self):
+        self.assertEqual(
+            self.fileinfos,
+            list(save_result(iter(self.fileinfos), self.path, [])))
+
+    def test_loads_every_file(self):
+        result_file = self.save()
+        self.assertEqual(3, len(result_file))
+        for expected, loaded in zip(self.fileinfos, result_file):
+            self.assertSameFile(expected, loaded)
+
+    def test_one_file_by_index(self):
+        self.assertSameFile(self.fileinfos[2], self.save().fileinfo(2))
+
+    def test_one_file_by_name(self):
+        result_file = self.save()
+        self.assertSameFile(self.fileinfos[0], result_file.find("src/a.c"))
+        self.assertIsNone(result_file.find("src/none.c"))
+
+    def test_float_and_missing_values(self):
+        fun = FunctionInfo("foo", "a.c")
+        fun.max_nesting_depth = 1.5
+        other = FunctionInfo("bar", "a.c")
+        loaded = self.save([FileInformation("a.c", 1, [fun, other])])
+        loaded_fun, loaded_other = loaded.fileinfo(0).function_list
+        self.assertEqual(1.5, loaded_fun.max_nesting_depth)
+        self.assertIsNone(loaded_other.max_nesting_depth)
+
+    def test_integers_take_four_bytes(self):
+        writer = ResultFileWriter([])
+        for fileinfo in self.fileinfos:
+            writer.add(fileinfo)
+        self.assertEqual(
+            ["i"], list(set(values.typecode for _, kind, values
+                            in writer.columns if kind == b"i")))
+
+    def test_empty_result(self):
+        self.assertEqual([], list(self.save([])))
+
+    def test_not_a_result_file(self):
+        with open(self.path, "wb") as other:
+            other.write(b"<?xml version='1.0'?>" * 10)
+        self.assertRaises(ValueError, ResultFile, self.path)
+
+
+class TestSaveAndLoadOptions(StreamStdoutTestCase):
+
+    def setUp(self):
+        StreamStdoutTestCase.setUp(self)
+        self.dir = mkdtemp()
+        self.path = os.path.join(self.dir, "result.lzr")
+
+    def tearDown(self):
+        rmtree(self.dir)
+        StreamStdoutTestCase.tearDown(self)
+
+    def run_main(self, *argv):
+        sys.stdout.stream = ""
+        try:
+            main(["lizard"] + list(argv))
+        except SystemExit:
+            pass
+        return sys.stdout.stream
+
+    def test_load_prints_the_same_as_the_analysis(self):
+        analyzed = self.run_main("--save", self.path, "-End", "lizard_ext")
+        self.assertEqual(analyzed, self.run_main("--load", self.path, "-End"))
+
+    def test_load_feeds_other_printers(self):
+        self.run_main("--save", self.path, "lizard_ext")
+        self.assertEqual(self.run_main("--csv", "lizard_ext"),
+                         self.run_main("--load", self.path, "--csv"))